@@ -0,0 +1,221 @@
+"""Local stand-ins for Supabase, Gemini, MegaLLM and the STT providers.
+
+install() swaps them in underneath the real service modules, so routes, caches,
+limiters and the job queue all run as in production; only the network calls are
+replaced by sleeps with configurable latency, jitter and error rate.
+"""
+import asyncio
+import io
+import json
+import os
+import random
+import re
+import wave
+from types import SimpleNamespace
+
+from services import gemini, mega_llm, stt
+from services.db_backend import MemoryBackend, set_backend
+from services.fast_extract import fast_extract_log
+from services.metrics import timed
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS_PATH = os.path.join(HERE, "bench_fast_extract_corpus.jsonl")
+PATIENT_NAMES = ["Ishan", "Aryan", "Arnav", "Anshuman", "Laksh", "Daksh", "Meera", "Priya", "Kavya", "Rohan"]
+
+
+class FakeProviderError(Exception):
+    """Stands in for an upstream 503, which the provider limiters retry."""
+    status_code = 503
+
+
+class FakeLatency:
+    def __init__(self, ms: float, jitter: float = 0.2, error_rate: float = 0.0, seed: int = None):
+        self.ms = ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+
+    async def wait(self, scale: float = 1.0):
+        spread = self.ms * self.jitter
+        await asyncio.sleep(max(0.0, scale * self.random.uniform(self.ms - spread, self.ms + spread)) / 1000)
+        if self.error_rate and self.random.random() < self.error_rate:
+            raise FakeProviderError("fake provider error")
+
+
+def load_transcripts() -> list:
+    with open(CORPUS_PATH) as f:
+        return [json.loads(line)["transcript"] for line in f if line.strip()]
+
+
+def _prompt_text(messages) -> str:
+    # langchain messages from gemini.py, plain dicts from mega_llm.py
+    parts = []
+    for message in messages:
+        content = message["content"] if isinstance(message, dict) else message.content
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        parts.append(content)
+    return "\n".join(parts)
+
+
+def _between(text: str, start: str, end: str = "\n") -> str:
+    match = re.search(re.escape(start) + r"(.*?)(?:" + re.escape(end) + r"|$)", text, re.S)
+    return match.group(1).strip() if match else ""
+
+
+CHAT_REPLY = "Give the next paracetamol dose as charted and recheck the temperature in an hour."
+
+
+def fake_reply(prompt: str) -> str:
+    """Answers each services/prompts.py prompt with text of the shape it asks for."""
+    if "clinical log extractor" in prompt:
+        transcript = _between(prompt, "Transcript:") or _between(prompt, "Raw transcript:")
+        structured = fast_extract_log(transcript, _between(prompt, "Prescription context:"))
+        structured.pop("extracted_by")
+        if "clean_transcript" in prompt:
+            structured["clean_transcript"] = transcript
+        return json.dumps(structured)
+    if "reading a doctor's prescription" in prompt:
+        return json.dumps({"medications": [
+            {"drug": "Paracetamol", "dose": "500 mg", "frequency": "TDS", "route": "PO"},
+            {"drug": "Ceftriaxone", "dose": "1 g", "frequency": "BD", "route": "IV"},
+        ]})
+    if "summary" in prompt and "pending_tasks" in prompt:
+        return json.dumps({
+            "summary": "Stable shift. Medications given as charted, vitals within range.",
+            "pending_tasks": ["Recheck BP at 8 pm"],
+            "high_priority": [],
+        })
+    if "Fix this nurse transcript:" in prompt:
+        return _between(prompt, "Fix this nurse transcript:")
+    if "Earlier summary:" in prompt:
+        return "Nurse asked about medication timing; no open questions."
+    return CHAT_REPLY
+
+
+class FakeGeminiModel:
+    """Enough of ChatGoogleGenerativeAI for gemini.py: ainvoke over a message list."""
+
+    def __init__(self, latency: FakeLatency):
+        self.latency = latency
+
+    async def ainvoke(self, messages):
+        prompt = _prompt_text(messages)
+        # longer prompts (handoffs over many logs) take proportionally longer
+        await self.latency.wait(scale=1 + len(prompt) / 8000)
+        return SimpleNamespace(content=fake_reply(prompt))
+
+
+class _FakeStream:
+    def __init__(self, words: list, latency: FakeLatency):
+        self.words = words
+        self.latency = latency
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        for word in self.words:
+            await asyncio.sleep(self.latency.ms / 1000 / max(1, len(self.words)))
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "))])
+
+    async def close(self):
+        pass
+
+
+class FakeOpenAI:
+    """Enough of AsyncOpenAI for mega_llm: chat.completions.create, streaming or not."""
+
+    def __init__(self, latency: FakeLatency):
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model: str, messages: list, stream: bool = False, **kwargs):
+        if stream:
+            # time to first token is a fraction of a full completion
+            await self.latency.wait(scale=0.25)
+            return _FakeStream(CHAT_REPLY.split(), self.latency)
+        prompt = _prompt_text(messages)
+        await self.latency.wait(scale=1 + len(prompt) / 8000)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=fake_reply(prompt)))])
+
+
+def fake_transcriber(latency: FakeLatency, transcripts: list):
+    @timed("stt", lambda args, kwargs: f"fake_{args[2]}")
+    async def transcribe(audio_bytes, filename, provider, language_hint, stt_mode, stt_model) -> dict:
+        # STT cost grows with audio length: ~32 kB per second of 16 kHz mono PCM16
+        await latency.wait(scale=max(0.25, len(audio_bytes) / 32000 / 5))
+        return {
+            "transcript": latency.random.choice(transcripts),
+            "language": language_hint,
+            "confidence": round(latency.random.uniform(0.7, 0.98), 2),
+            "provider": provider,
+        }
+    return transcribe
+
+
+def wav_bytes(seconds: float = 5.0, seed: int = None) -> bytes:
+    # noise rather than silence so every upload has a distinct content hash
+    rng = random.Random(seed)
+    frames = rng.randbytes(int(seconds * 16000) * 2)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(16000)
+        out.writeframes(frames)
+    return buf.getvalue()
+
+
+async def seed(backend: MemoryBackend, patients: int, logs_per_patient: int, transcripts: list) -> dict:
+    """Patients, prescriptions with parsed schedules, a closed shift with logs and an open shift."""
+    rng = random.Random(0)
+    patient_rows = await backend.insert("patients", [
+        {"name": f"{PATIENT_NAMES[i % len(PATIENT_NAMES)]} {i}", "ward": f"Ward {i % 4 + 1}", "bed": str(i + 1)}
+        for i in range(patients)
+    ])
+    closed, active = await backend.insert("shifts", [
+        {"nurse_id": "bench-nurse-1", "status": "closed"},
+        {"nurse_id": "bench-nurse-2", "status": "active"},
+    ])
+    for patient in patient_rows:
+        prescription = (await backend.insert("prescriptions", {
+            "patient_id": patient["id"], "file_url": "memory://prescriptions/bench.pdf", "filename": "bench.pdf",
+        }))[0]
+        await backend.insert("medication_schedule", [
+            {"patient_id": patient["id"], "prescription_id": prescription["id"],
+             "drug": "paracetamol", "dose": "500 mg", "frequency": "TDS", "route": "PO"},
+        ])
+        rows = []
+        for _ in range(logs_per_patient):
+            transcript = rng.choice(transcripts)
+            rows.append({
+                "patient_id": patient["id"], "nurse_id": "bench-nurse-1", "shift_id": closed["id"],
+                "raw_text": transcript, "structured_log": fast_extract_log(transcript),
+                "confidence": 0.9, "needs_review": False,
+            })
+        await backend.insert("logs", rows)
+    return {
+        "patient_ids": [p["id"] for p in patient_rows],
+        "closed_shift_id": closed["id"],
+        "active_shift_id": active["id"],
+    }
+
+
+async def install(
+    llm_ms: float = 800,
+    stt_ms: float = 1500,
+    jitter: float = 0.2,
+    error_rate: float = 0.0,
+    patients: int = 50,
+    logs_per_patient: int = 10,
+    seed_value: int = 0,
+) -> dict:
+    """Swap every external dependency for a local fake and seed the in-memory tables."""
+    transcripts = load_transcripts()
+    backend = MemoryBackend()
+    set_backend(backend)
+    gemini._model = FakeGeminiModel(FakeLatency(llm_ms, jitter, error_rate, seed_value))
+    mega_llm._client = FakeOpenAI(FakeLatency(llm_ms * 0.6, jitter, error_rate, seed_value + 1))
+    stt._transcribe_uncached = fake_transcriber(FakeLatency(stt_ms, jitter, error_rate, seed_value + 2), transcripts)
+    return await seed(backend, patients, logs_per_patient, transcripts)
@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+from services.fast_extract import FAST_EXTRACT_MIN_CONFIDENCE, fast_extract_log
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIELDS = ["action_type", "medication", "dose", "time_mentioned", "priority"]
+
+
+def norm(value) -> str:
+    # "500 mg" == "500mg", "Paracetamol" == "paracetamol", None == ""
+    return str(value).lower().replace(" ", "").replace(".", "") if value is not None else ""
+
+
+def mismatches(a: dict, b: dict) -> list:
+    return [f for f in FIELDS if norm(a.get(f)) != norm(b.get(f))]
+
+
+def load_corpus(path: str) -> list:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def time_rules(corpus: list, runs: int) -> float:
+    # median microseconds per note
+    times = []
+    for _ in range(runs):
+        for row in corpus:
+            start = time.perf_counter()
+            fast_extract_log(row["transcript"], row["prescription"])
+            times.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(times)
+
+
+async def llm_extractions(corpus: list) -> tuple[list, float]:
+    # straight to the model, bypassing the result cache so latencies are real
+    from services import gemini, prompts
+    from services.llm_gateway import _json
+    results, times = [], []
+    for row in corpus:
+        start = time.perf_counter()
+        results.append(_json(await gemini.complete(prompts.extract_messages(row["transcript"], row["prescription"]))))
+        times.append((time.perf_counter() - start) * 1000)
+    return results, statistics.median(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fast-path extractor: coverage, accuracy, LLM agreement and latency saved")
+    parser.add_argument("--corpus", default=os.path.join(HERE, "bench_fast_extract_corpus.jsonl"))
+    parser.add_argument("--threshold", type=float, default=FAST_EXTRACT_MIN_CONFIDENCE)
+    parser.add_argument("--llm", action="store_true", help="also run Gemini on every note (needs credentials)")
+    parser.add_argument("--llm-ms", type=float, default=2000, help="assumed Gemini latency when --llm is not given")
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--verbose", action="store_true", help="list every fast-path note that disagrees")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    extracted = [fast_extract_log(row["transcript"], row["prescription"]) for row in corpus]
+    covered = [i for i, e in enumerate(extracted) if e["confidence"] >= args.threshold]
+
+    print(f"📚 {len(corpus)} labelled notes, threshold {args.threshold}")
+    print(f"⚡ fast-path coverage: {len(covered)}/{len(corpus)} ({len(covered) / len(corpus):.0%})")
+
+    wrong = [i for i in covered if mismatches(extracted[i], corpus[i]["expected"])]
+    field_hits = sum(len(FIELDS) - len(mismatches(extracted[i], corpus[i]["expected"])) for i in covered)
+    if covered:
+        print(f"🎯 label accuracy on fast path: notes {1 - len(wrong) / len(covered):.0%}, "
+              f"fields {field_hits / (len(covered) * len(FIELDS)):.0%}")
+    fallthrough_hits = sum(
+        1 for i, e in enumerate(extracted) if i not in covered and not mismatches(e, corpus[i]["expected"])
+    )
+    print(f"↪️  fell through to the LLM: {len(corpus) - len(covered)} "
+          f"({fallthrough_hits} of them the rules would have got right)")
+    if args.verbose:
+        for i in wrong:
+            print(f"   ✗ {corpus[i]['transcript']!r}: {mismatches(extracted[i], corpus[i]['expected'])}")
+
+    rules_us = time_rules(corpus, args.runs)
+    llm_ms = args.llm_ms
+    if args.llm:
+        llm_results, llm_ms = asyncio.run(llm_extractions(corpus))
+        agree = [i for i in covered if not mismatches(extracted[i], llm_results[i])]
+        llm_right = sum(1 for i, r in enumerate(llm_results) if not mismatches(r, corpus[i]["expected"]))
+        print(f"🤝 agreement with Gemini on fast path: {len(agree)}/{len(covered)}")
+        print(f"🧪 Gemini label accuracy (all notes): {llm_right / len(corpus):.0%}")
+        if args.verbose:
+            for i in covered:
+                if i not in agree:
+                    print(f"   ≠ {corpus[i]['transcript']!r}: {mismatches(extracted[i], llm_results[i])}")
+
+    saved = len(covered) * (llm_ms - rules_us / 1000)
+    source = "measured" if args.llm else "assumed"
+    print(f"⏱️  rules p50 {rules_us:.1f} µs/note, Gemini p50 {llm_ms:.0f} ms/note ({source})")
+    print(f"💰 extraction time saved: {saved / 1000:.1f} s over the corpus, "
+          f"{saved / len(corpus):.0f} ms per note on average")
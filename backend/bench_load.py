@@ -0,0 +1,221 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+DEFAULT_MIX = "logs_create=4,logs_list=3,patients=2,handoff_summary=1,agent_chat=2"
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"unknown scenarios: {', '.join(sorted(unknown))} (have {', '.join(SCENARIOS)})")
+    return mix
+
+
+# each scenario: (client, seeded ids, rng, args) -> response
+async def logs_create(client, ids, rng, args):
+    from bench_fakes import wav_bytes
+    return await client.post("/api/logs/create", files={
+        "audio": ("note.wav", wav_bytes(args.audio_seconds, rng.random() if not args.repeat_audio else 0), "audio/wav"),
+    }, data={
+        "patient_id": rng.choice(ids["patient_ids"]),
+        "nurse_id": "bench-nurse-2",
+        "shift_id": ids["active_shift_id"],
+        "pipeline_mode": args.pipeline_mode,
+    })
+
+
+async def logs_list(client, ids, rng, args):
+    return await client.get(f"/api/logs/patient/{rng.choice(ids['patient_ids'])}", params={"limit": 50})
+
+
+async def patients(client, ids, rng, args):
+    return await client.get("/api/patients/")
+
+
+async def handoff_summary(client, ids, rng, args):
+    return await client.get(f"/api/handoff/summary/{rng.choice(ids['patient_ids'])}")
+
+
+async def agent_chat(client, ids, rng, args):
+    return await client.post("/api/agent/chat", json={
+        "message": "When is the next paracetamol dose due?",
+        "patient_id": rng.choice(ids["patient_ids"]),
+    })
+
+
+SCENARIOS = {
+    "logs_create": logs_create,
+    "logs_list": logs_list,
+    "patients": patients,
+    "handoff_summary": handoff_summary,
+    "agent_chat": agent_chat,
+}
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def drive(client, ids: dict, args) -> tuple[dict, float]:
+    mix = parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+    results = {name: {"latencies": [], "errors": 0} for name in names}
+    remaining = args.requests
+
+    async def worker(worker_id: int):
+        nonlocal remaining
+        rng = random.Random(args.seed * 1000 + worker_id)
+        while remaining > 0:
+            remaining -= 1
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                response = await SCENARIOS[name](client, ids, rng, args)
+                ok = response.status_code < 400
+            except Exception:
+                ok = False
+            results[name]["latencies"].append((time.perf_counter() - start) * 1000)
+            if not ok:
+                results[name]["errors"] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    return results, time.perf_counter() - start
+
+
+def summarize(results: dict, elapsed: float, args) -> dict:
+    report = {
+        "config": {k: getattr(args, k) for k in (
+            "requests", "concurrency", "mix", "llm_ms", "stt_ms", "jitter", "pipeline_mode", "audio_seconds",
+        )},
+        "elapsed_s": round(elapsed, 3),
+        "scenarios": {},
+    }
+    total = errors = 0
+    for name, result in results.items():
+        latencies = result["latencies"]
+        if not latencies:
+            continue
+        total += len(latencies)
+        errors += result["errors"]
+        report["scenarios"][name] = {
+            "requests": len(latencies),
+            "errors": result["errors"],
+            "rps": round(len(latencies) / elapsed, 2),
+            "p50_ms": round(statistics.median(latencies), 1),
+            "p99_ms": round(percentile(latencies, 0.99), 1),
+            "max_ms": round(max(latencies), 1),
+        }
+    report["total"] = {"requests": total, "errors": errors, "rps": round(total / elapsed, 2)}
+    return report
+
+
+def print_report(report: dict):
+    print(f"{'scenario':<16}{'reqs':>7}{'errs':>6}{'rps':>9}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, s in report["scenarios"].items():
+        print(f"{name:<16}{s['requests']:>7}{s['errors']:>6}{s['rps']:>9.1f}{s['p50_ms']:>10.1f}{s['p99_ms']:>10.1f}{s['max_ms']:>10.1f}")
+    t = report["total"]
+    print(f"{'total':<16}{t['requests']:>7}{t['errors']:>6}{t['rps']:>9.1f}   in {report['elapsed_s']:.1f} s")
+
+
+def regressions(report: dict, baseline: dict, tolerance: float) -> list:
+    """Human-readable failures against a previous --json report; empty means the gate passes."""
+    failures = []
+    for name, base in baseline["scenarios"].items():
+        current = report["scenarios"].get(name)
+        if current is None:
+            continue
+        if current["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            failures.append(f"{name}: p99 {current['p99_ms']} ms > baseline {base['p99_ms']} ms +{tolerance:.0%}")
+        if current["p50_ms"] > base["p50_ms"] * (1 + tolerance):
+            failures.append(f"{name}: p50 {current['p50_ms']} ms > baseline {base['p50_ms']} ms +{tolerance:.0%}")
+    if report["total"]["rps"] < baseline["total"]["rps"] * (1 - tolerance):
+        failures.append(f"total: {report['total']['rps']} rps < baseline {baseline['total']['rps']} rps -{tolerance:.0%}")
+    if report["total"]["errors"] > baseline["total"]["errors"]:
+        failures.append(f"total: {report['total']['errors']} errors > baseline {baseline['total']['errors']}")
+    return failures
+
+
+def configure_env(args, workdir: str):
+    # must run before the app is imported: these are read at import time
+    os.environ.setdefault("DB_BACKEND", "memory")
+    os.environ["JOB_DB_PATH"] = os.path.join(workdir, "jobs.sqlite3")
+    os.environ["RESULT_CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ.setdefault("WARMUP", "")
+    if args.no_result_cache:
+        os.environ["RESULT_CACHE_DISK_MB"] = "0"
+        os.environ["STT_CACHE_SIZE"] = "0"
+        os.environ["EXTRACT_CACHE_SIZE"] = "0"
+
+
+async def run(args) -> dict:
+    import httpx
+    import bench_fakes
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        ids = await bench_fakes.install(
+            llm_ms=args.llm_ms, stt_ms=args.stt_ms, jitter=args.jitter,
+            error_rate=args.error_rate, patients=args.patients, seed_value=args.seed,
+        )
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            if args.warmup:
+                warm = argparse.Namespace(**{**vars(args), "requests": args.warmup})
+                await drive(client, ids, warm)
+            results, elapsed = await drive(client, ids, args)
+    return summarize(results, elapsed, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline load test: real app, fake Supabase/LLM/STT, p50/p99 and RPS report")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted scenarios (default {DEFAULT_MIX})")
+    parser.add_argument("--llm-ms", type=float, default=800, help="fake Gemini latency; MegaLLM gets 60%% of it")
+    parser.add_argument("--stt-ms", type=float, default=1500, help="fake STT latency for a 5 s note")
+    parser.add_argument("--jitter", type=float, default=0.2, help="± fraction of the fake latencies")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake provider calls that fail")
+    parser.add_argument("--patients", type=int, default=50)
+    parser.add_argument("--audio-seconds", type=float, default=5)
+    parser.add_argument("--repeat-audio", action="store_true", help="send identical audio so the STT cache hits")
+    parser.add_argument("--no-result-cache", action="store_true", help="disable the STT/extract result caches")
+    parser.add_argument("--pipeline-mode", default="two_stage")
+    parser.add_argument("--warmup", type=int, default=20, help="requests sent before measuring")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report here, e.g. to keep as a baseline")
+    parser.add_argument("--baseline", help="earlier --json report to gate against; exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown vs --baseline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="nursesync-bench-") as workdir:
+        configure_env(args, workdir)
+        report = asyncio.run(run(args))
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 report written to {args.json}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = regressions(report, json.load(f), args.tolerance)
+        for failure in failures:
+            print(f"❌ {failure}")
+        if failures:
+            sys.exit(1)
+        print("✅ no regressions against baseline")
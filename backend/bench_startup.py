@@ -0,0 +1,68 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from bench_stt_decode import make_wav
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_import(env: dict) -> float:
+    # fresh interpreter each time so nothing is cached in sys.modules
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=HERE, env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1]) * 1000
+
+
+def wait_for(fn, timeout: float) -> float:
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            if fn():
+                return (time.perf_counter() - start) * 1000
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError("server did not become ready in time")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure NurseSync cold-start: import time, first /health, first /api/logs/create")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--warmup", default="", help="value for WARMUP, e.g. whisper,gemini,megallm")
+    parser.add_argument("--skip-create", action="store_true", help="only measure import and /health")
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    env = {**os.environ, "WARMUP": args.warmup}
+    print(f"📦 import main: {measure_import(env):.0f} ms")
+
+    base = f"http://127.0.0.1:{args.port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port)],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for(lambda: httpx.get(f"{base}/health").status_code == 200, args.timeout)
+        print(f"💓 first /health: {(time.perf_counter() - start) * 1000:.0f} ms after spawn")
+
+        if not args.skip_create:
+            def create():
+                response = httpx.post(
+                    f"{base}/api/logs/create",
+                    # tone plus noise: a silent note is rejected before STT and would never return 200
+                    files={"audio": ("bench.wav", make_wav(2.0, 16000, 1), "audio/wav")},
+                    data={"patient_id": "bench-patient", "nurse_id": "bench-nurse", "shift_id": "bench-shift"},
+                    timeout=args.timeout,
+                )
+                return response.status_code == 200
+            wait_for(create, args.timeout)
+            print(f"📝 first /api/logs/create: {(time.perf_counter() - start) * 1000:.0f} ms after spawn")
+    finally:
+        server.terminate()
+        server.wait()
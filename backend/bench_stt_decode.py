@@ -0,0 +1,83 @@
+import argparse
+import io
+import os
+import statistics
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+from services.audio import SAMPLE_RATE, decode_audio
+
+
+def make_wav(seconds: float, rate: int, channels: int) -> bytes:
+    # speech-ish test tone with some noise, 16-bit PCM
+    t = np.arange(int(seconds * rate)) / rate
+    tone = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.05 * np.random.randn(t.size)
+    pcm = (np.clip(tone, -1, 1) * 32767).astype(np.int16)
+    if channels > 1:
+        pcm = np.repeat(pcm[:, None], channels, axis=1)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+    return buf.getvalue()
+
+
+def tempfile_decode(audio_bytes: bytes, ext: str = ".wav") -> np.ndarray:
+    # the legacy path: write to disk, let whisper spawn ffmpeg on the file, unlink
+    import whisper
+    with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp_file:
+        tmp_file.write(audio_bytes)
+        tmp_path = tmp_file.name
+    try:
+        return whisper.load_audio(tmp_path, sr=SAMPLE_RATE)
+    finally:
+        os.unlink(tmp_path)
+
+
+def bench(name, fn, runs):
+    fn()  # warm-up
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    p99 = times[min(len(times) - 1, int(len(times) * 0.99))]
+    print(f"{name:<12} p50 {statistics.median(times):8.2f} ms   p99 {p99:8.2f} ms")
+    return statistics.median(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare in-memory audio decoding with the temp-file path")
+    parser.add_argument("--file", help="audio file to decode (default: synthetic WAV)")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rate", type=int, default=48000)
+    parser.add_argument("--channels", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--transcribe", action="store_true", help="also time full whisper transcription")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, "rb") as f:
+            audio_bytes = f.read()
+        ext = os.path.splitext(args.file)[1] or ".wav"
+    else:
+        audio_bytes = make_wav(args.seconds, args.rate, args.channels)
+        ext = ".wav"
+
+    print(f"📦 {len(audio_bytes) / 1024:.0f} KiB input, {args.runs} runs\n")
+    memory_ms = bench("memory", lambda: decode_audio(audio_bytes), args.runs)
+    tempfile_ms = bench("tempfile", lambda: tempfile_decode(audio_bytes, ext), args.runs)
+    print(f"\n⚡ in-memory decode is {tempfile_ms / memory_ms:.1f}x faster ({tempfile_ms - memory_ms:.1f} ms saved per note)")
+
+    if args.transcribe:
+        from services.stt import _transcribe_bytes_with_whisper, _transcribe_file_with_whisper
+        runs = max(1, args.runs // 10)
+        print()
+        bench("stt/memory", lambda: _transcribe_bytes_with_whisper(audio_bytes, "en"), runs)
+        bench("stt/tempfile", lambda: _transcribe_file_with_whisper(audio_bytes, "audio" + ext, "en"), runs)
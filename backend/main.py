@@ -1,11 +1,58 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routes import handoff, agent, prescription, logs, patients
+from routes import handoff, agent, prescription, logs, logs_stream, logs_batch, patients, uploads, metrics
+from services import stt, gemini, mega_llm, job_queue, prescription_index
+from services.db_backend import close_backend
+from services.llm_runtime import close_http_client
 from dotenv import load_dotenv
 
 load_dotenv()
 
-app = FastAPI(title="NurseSync API", version="1.0.0")
+# heavy clients load on first use; WARMUP=whisper,sarvam,gemini,megallm preloads them in the background
+WARMUP_HOOKS = {
+    "whisper": stt.warm_up,
+    "sarvam": stt.warm_up_sarvam,
+    "gemini": gemini.warm_up,
+    "megallm": mega_llm.warm_up,
+}
+
+async def warm_up(names: list):
+    for name in names:
+        hook = WARMUP_HOOKS.get(name)
+        if hook is None:
+            continue
+        try:
+            await asyncio.to_thread(hook)
+        except Exception as e:
+            print(f"⚠️  warm-up of {name} failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    names = [n.strip().lower() for n in os.getenv("WARMUP", "").split(",") if n.strip()]
+    warmup_task = asyncio.create_task(warm_up(names)) if names else None
+    # async-mode /api/logs/create jobs and prescription parsing, including any left over from the last run
+    job_queue.start_workers({
+        "log": logs.process_log_job,
+        "prescription": prescription_index.index_prescription_job,
+    })
+    yield
+    await job_queue.stop_workers()
+    if warmup_task:
+        warmup_task.cancel()
+    # release pooled DB and LLM connections on worker shutdown
+    await close_backend()
+    await close_http_client()
+
+app = FastAPI(title="NurseSync API", version="1.0.0", lifespan=lifespan)
+
+# oversized prescription uploads are refused before their body is read
+# (registered first so CORS headers still wrap the 413)
+app.add_middleware(uploads.UploadSizeLimit)
+# per-route latency histograms, plus a Server-Timing header when SERVER_TIMING=1 or asked for
+app.add_middleware(metrics.RequestMetrics)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,7 +65,10 @@ app.include_router(handoff.router, prefix="/api/handoff", tags=["Handoff"])
 app.include_router(agent.router, prefix="/api/agent", tags=["Agent"])
 app.include_router(prescription.router, prefix="/api/prescription", tags=["Prescription"])
 app.include_router(logs.router, prefix="/api/logs", tags=["Logs"])
+app.include_router(logs_stream.router, prefix="/api/logs", tags=["Logs"])
+app.include_router(logs_batch.router, prefix="/api/logs", tags=["Logs"])
 app.include_router(patients.router, prefix="/api/patients", tags=["Patients"])
+app.include_router(metrics.router)
 
 @app.get("/health")
 def health(): return {"status": "NurseSync is live 🚀"}
\ No newline at end of file
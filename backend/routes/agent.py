@@ -1,37 +1,104 @@
-from fastapi import APIRouter
+import json
+import time
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
-from services.mega_llm import chat_agent
+from services.llm_gateway import chat_agent, stream_chat_agent
 from services.db import get_patient_by_id
+from services.chat_sessions import load_session, prompt_history, record_turn
+from services.metrics import observe
 
 router = APIRouter()
 
 class ChatRequest(BaseModel):
     message: str
     patient_id: Optional[str] = None
+    # with a (client-generated) session_id the server keeps the history and
+    # conversation_history only seeds a new or expired session; without one
+    # nothing is stored and conversation_history is the whole context
+    session_id: Optional[str] = None
     conversation_history: list = []
 
+async def _patient_context(patient_id: Optional[str]) -> str:
+    # get patient context if patient_id provided
+    if not patient_id:
+        return "none"
+    try:
+        patient = await get_patient_by_id(patient_id)
+        return f"{patient['name']} in {patient['ward']}"
+    except:
+        return "none"
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _reply_body(req: ChatRequest, session_id: Optional[str], reply: str) -> dict:
+    body = {"reply": reply}
+    if session_id:
+        body["session_id"] = session_id
+    else:
+        # legacy clients resend the whole history each turn
+        body["history"] = req.conversation_history + [
+            {"role": "user", "content": req.message},
+            {"role": "assistant", "content": reply}
+        ]
+    return body
+
 @router.post("/chat")
 async def chat(req: ChatRequest):
-    # get patient context if patient_id provided
-    patient_context = "none"
-    if req.patient_id:
-        try:
-            patient = await get_patient_by_id(req.patient_id)
-            patient_context = f"{patient['name']} in {patient['ward']}"
-        except:
-            patient_context = "none"
+    patient_context = await _patient_context(req.patient_id)
+    session_id, session = await load_session(req.session_id, seed_history=req.conversation_history)
 
     reply = await chat_agent(
         message=req.message,
         patient_context=patient_context,
-        history=req.conversation_history
+        history=prompt_history(session)
     )
 
-    return {
-        "reply": reply,
-        "history": req.conversation_history + [
-            {"role": "user", "content": req.message},
-            {"role": "assistant", "content": reply}
-        ]
-    }
\ No newline at end of file
+    await record_turn(session_id, session, req.message, reply)
+    return _reply_body(req, session_id, reply)
+
+@router.post("/chat/stream")
+async def chat_stream(req: ChatRequest, request: Request):
+    # same contract as /chat, but tokens arrive as SSE "token" events and the
+    # final "done" event carries the /chat body plus ttft_ms
+    patient_context = await _patient_context(req.patient_id)
+    session_id, session = await load_session(req.session_id, seed_history=req.conversation_history)
+
+    async def events():
+        start = time.perf_counter()
+        ttft_ms = None
+        parts = []
+        tokens = stream_chat_agent(
+            message=req.message,
+            patient_context=patient_context,
+            history=prompt_history(session)
+        )
+        try:
+            async for text in tokens:
+                if ttft_ms is None:
+                    ttft_ms = round((time.perf_counter() - start) * 1000, 1)
+                parts.append(text)
+                yield _sse("token", {"text": text})
+                if await request.is_disconnected():
+                    # nurse closed the chat; stop paying for upstream generation
+                    return
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+            return
+        finally:
+            await tokens.aclose()
+
+        reply = "".join(parts).strip() or "Sorry, I couldn't process that. Please try again."
+        if ttft_ms is not None:
+            observe("nursesync_chat_ttft_seconds", ttft_ms / 1000)
+        observe("nursesync_chat_stream_seconds", time.perf_counter() - start)
+        await record_turn(session_id, session, req.message, reply)
+        yield _sse("done", {**_reply_body(req, session_id, reply), "ttft_ms": ttft_ms})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
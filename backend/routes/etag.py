@@ -0,0 +1,16 @@
+import hashlib
+import json
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+
+def etag_response(request: Request, body) -> Response:
+    # weak validator over the JSON body; unchanged data costs the client a 304
+    payload = json.dumps(body, sort_keys=True, default=str, separators=(",", ":"))
+    etag = f'W/"{hashlib.sha1(payload.encode()).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=json.loads(payload), headers=headers)
@@ -5,7 +5,9 @@ from services.db import (
     get_pending_handoff, accept_handoff,
     update_shift_status, start_shift, get_last_shift_logs_for_patient
 )
-from services.gemini import generate_handoff
+from services.handoff_engine import summarize_logs, HANDOFF_LOG_COLUMNS
+from services.shift_summary import fold_shift
+from services.handoff_cache import summary_cache, summary_key
 
 router = APIRouter()
 
@@ -28,13 +30,13 @@ async def start_new_shift(req: StartShiftRequest):
 @router.post("/shift/end")
 async def end_shift(req: EndShiftRequest):
     # get all logs from this shift
-    logs = await get_logs_by_shift(req.shift_id)
+    logs = await get_logs_by_shift(req.shift_id, columns=HANDOFF_LOG_COLUMNS)
 
     if not logs:
         return {"error": "No logs found for this shift"}
 
-    # gemini summarizes everything
-    summary = await generate_handoff(logs)
+    # rolling summary is kept up to date as logs arrive, so only the unfolded tail is merged here
+    summary = await fold_shift(req.shift_id, logs)
 
     # save handoff
     handoff = await save_handoff(
@@ -81,8 +83,14 @@ async def get_patient_handoff_summary(patient_id: str):
     if not logs:
         return {"message": "No previous shift logs for this patient"}
 
-    # gemini summarizes
-    summary = await generate_handoff(logs)
+    # closed-shift logs don't change, so reuse the summary until they're edited
+    key = summary_key(patient_id, logs)
+    summary = await summary_cache.get(key, group=patient_id)
+    cache_hit = summary is not None
+    report = None
+    if not cache_hit:
+        summary, report = await summarize_logs(logs)
+        await summary_cache.set(key, summary, group=patient_id)
 
     return {
         "patient_id": patient_id,
@@ -90,5 +98,7 @@ async def get_patient_handoff_summary(patient_id: str):
         "summary": summary["summary"],
         "high_priority": summary["high_priority"],
         "pending_tasks": summary["pending_tasks"],
-        "logs": logs
+        "logs": logs,
+        "cache": {"hit": cache_hit, **summary_cache.stats()},
+        "report": report
     }
\ No newline at end of file
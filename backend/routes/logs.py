@@ -1,45 +1,138 @@
-from fastapi import APIRouter, UploadFile, File, Form
+import asyncio
+import json
+import os
+import time
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
 from services.stt import transcribe_audio
-from services.gemini import extract_log
-from services.db import save_log, get_logs
-from services.mega_llm import clean_transcript
+from services.audio import EmptyRecording
+from services.llm_gateway import extract_log, clean_and_extract, clean_transcript
+from services.fast_extract import try_fast_extract
+from services.prescription_index import resolve_context, matches_schedule
+from services.db import save_log, get_logs, update_log, count_logs
+from services.handoff_cache import invalidate_patient
+from services.shift_summary import refold_shift, schedule_fold
+from services import job_queue, result_cache
+from services.metrics import stage
+from routes.pagination import select_columns, decode_cursor, next_cursor
 
 router = APIRouter()
 
-@router.post("/create")
-async def create_log_from_audio(
-    audio: UploadFile = File(...),
-    patient_id: str = Form(...),
-    nurse_id: str = Form(...),
-    shift_id: str = Form(...),
-    prescription_context: str = Form(default="none"),
-    stt_provider: str = Form(default="whisper"),
-    stt_language: str = Form(default="en"),
-    stt_mode: str = Form(default="transcribe"),
-    stt_model: str = Form(default="saaras:v3"),
-):
-    audio_bytes = await audio.read()
+LOGS_PAGE_SIZE = int(os.getenv("LOGS_PAGE_SIZE", "50"))
+LOG_CURSOR_COLUMNS = ["created_at", "id"]
 
-    # step 1: whisper → raw transcript
-    stt_result = await transcribe_audio(
-        audio_bytes,
-        audio.filename,
-        stt_provider=stt_provider,
-        language_hint=stt_language,
-        stt_mode=stt_mode,
-        stt_model=stt_model,
-    )
-    raw_transcript = stt_result["transcript"]
-    confidence = stt_result["confidence"]
+class UpdateLogRequest(BaseModel):
+    raw_text: Optional[str] = None
+    structured_log: Optional[dict] = None
+    needs_review: Optional[bool] = None
+
+PIPELINE_MODES = {"two_stage", "fused", "compare"}
+DEFAULT_PIPELINE_MODE = os.getenv("LOG_PIPELINE_MODE", "two_stage")
 
-    # step 2: megallm cleans transcript
+# fields used to score agreement between the fused and two-stage extractions
+AGREEMENT_FIELDS = ["action_type", "medication", "dose", "time_mentioned", "priority", "matched_prescription"]
+
+
+def _ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def _norm(value) -> str:
+    return str(value).strip().lower() if value is not None else ""
+
+
+def _extraction_agreement(a: dict, b: dict) -> dict:
+    mismatched = [f for f in AGREEMENT_FIELDS if _norm(a.get(f)) != _norm(b.get(f))]
+    return {
+        "score": round(1 - len(mismatched) / len(AGREEMENT_FIELDS), 2),
+        "mismatched_fields": mismatched,
+    }
+
+
+async def _run_two_stage(raw_transcript: str, prescription_context: str) -> tuple[str, dict, dict]:
+    timings = {}
+    start = time.perf_counter()
     clean = await clean_transcript(raw_transcript)
+    timings["clean"] = _ms(start)
+
+    start = time.perf_counter()
+    # routine notes the rule extractor parses confidently never reach Gemini
+    with stage("fast_extract"):
+        structured = try_fast_extract(clean, prescription_context)
+    if structured is None:
+        structured = await extract_log(clean, prescription_context)
+    timings["extract"] = _ms(start)
+    return clean, structured, timings
+
 
-    # step 3: gemini extracts structured log
-    structured = await extract_log(clean, prescription_context)
+async def _run_fused(raw_transcript: str, prescription_context: str) -> tuple[str, dict, dict]:
+    start = time.perf_counter()
+    # a note the rules parse confidently is formulaic enough to keep as transcribed
+    with stage("fast_extract"):
+        structured = try_fast_extract(raw_transcript, prescription_context)
+    if structured is not None:
+        return raw_transcript.strip(), structured, {"clean_extract": _ms(start)}
+    clean, structured = await clean_and_extract(raw_transcript, prescription_context)
+    return clean, structured, {"clean_extract": _ms(start)}
+
+
+async def run_llm_stages(
+    raw_transcript: str, prescription_context: str, mode: str, patient_id: str = None,
+) -> tuple[str, dict, dict, dict]:
+    """Clean + extract in the requested pipeline mode; returns (clean, structured, timings, comparison)."""
+    # the patient's parsed prescription index, when there is one, replaces the client's free text
+    prescription_context, schedule = await resolve_context(patient_id, prescription_context)
+    comparison = None
+    if mode == "fused":
+        clean, structured, stage_timings = await _run_fused(raw_transcript, prescription_context)
+    elif mode == "compare":
+        # A/B: run both pipelines side by side, keep the two-stage result
+        (clean, structured, stage_timings), (fused_clean, fused_structured, fused_timings) = await asyncio.gather(
+            _run_two_stage(raw_transcript, prescription_context),
+            _run_fused(raw_transcript, prescription_context),
+        )
+        comparison = {
+            "two_stage_ms": round(stage_timings["clean"] + stage_timings["extract"], 1),
+            "fused_ms": fused_timings["clean_extract"],
+            "fused_clean_transcript": fused_clean,
+            "fused_structured_log": fused_structured,
+            "agreement": _extraction_agreement(structured, fused_structured),
+        }
+    else:
+        clean, structured, stage_timings = await _run_two_stage(raw_transcript, prescription_context)
+    if schedule:
+        structured["matched_prescription"] = matches_schedule(structured, schedule)
+    return clean, structured, stage_timings, comparison
+
+
+async def finish_log(
+    stt_result: dict,
+    patient_id: str,
+    nurse_id: str,
+    shift_id: str,
+    prescription_context: str,
+    pipeline_mode: str,
+    stt_provider: str,
+    stt_language: str,
+    timings: dict,
+    total_start: float,
+) -> dict:
+    # everything after STT: clean, extract, save; shared by /create and /stream
+    mode = pipeline_mode if pipeline_mode in PIPELINE_MODES else "two_stage"
+    raw_transcript = stt_result["transcript"]
+    confidence = stt_result["confidence"]
+
+    # step 2+3: clean transcript and extract structured log
+    clean, structured, stage_timings, comparison = await run_llm_stages(
+        raw_transcript, prescription_context, mode, patient_id=patient_id,
+    )
+    timings.update(stage_timings)
     needs_review = confidence < 0.75
 
     # step 4: save
+    start = time.perf_counter()
     saved = await save_log(
         patient_id=patient_id,
         nurse_id=nurse_id,
@@ -49,8 +142,13 @@ async def create_log_from_audio(
         confidence=confidence,
         needs_review=needs_review
     )
+    timings["save"] = _ms(start)
+    timings["total"] = _ms(total_start)
 
-    return {
+    # fold into the shift's rolling handoff summary off the request path
+    schedule_fold(shift_id)
+
+    response = {
         "raw_transcript": raw_transcript,
         "clean_transcript": clean,
         "confidence": confidence,
@@ -60,9 +158,175 @@ async def create_log_from_audio(
         "stt_provider": stt_result.get("provider", stt_provider),
         "stt_detected_language": stt_result.get("language", stt_language),
         "stt_requested_language": stt_language,
+        "pipeline_mode": mode,
+        "timings_ms": timings,
+    }
+    if comparison:
+        response["pipeline_comparison"] = comparison
+    if stt_result.get("routing"):
+        response["stt_routing"] = stt_result["routing"]
+    if stt_result.get("preprocess"):
+        response["stt_preprocess"] = stt_result["preprocess"]
+    return response
+
+
+async def process_audio_log(
+    audio_bytes: bytes,
+    filename: str,
+    patient_id: str,
+    nurse_id: str,
+    shift_id: str,
+    prescription_context: str = "none",
+    stt_provider: str = "whisper",
+    stt_language: str = "en",
+    stt_mode: str = "transcribe",
+    stt_model: str = "saaras:v3",
+    pipeline_mode: str = DEFAULT_PIPELINE_MODE,
+) -> dict:
+    total_start = time.perf_counter()
+
+    # step 1: whisper → raw transcript
+    start = time.perf_counter()
+    stt_result = await transcribe_audio(
+        audio_bytes,
+        filename,
+        stt_provider=stt_provider,
+        language_hint=stt_language,
+        stt_mode=stt_mode,
+        stt_model=stt_model,
+    )
+    timings = {"stt": _ms(start)}
+    return await finish_log(
+        stt_result,
+        patient_id=patient_id,
+        nurse_id=nurse_id,
+        shift_id=shift_id,
+        prescription_context=prescription_context,
+        pipeline_mode=pipeline_mode,
+        stt_provider=stt_provider,
+        stt_language=stt_language,
+        timings=timings,
+        total_start=total_start,
+    )
+
+
+async def process_log_job(payload: dict, audio_bytes: bytes) -> dict:
+    # job_queue handler for async-mode uploads; payload holds the /create form fields.
+    # a note with no speech is a final answer, not a failure worth retrying
+    try:
+        return await process_audio_log(audio_bytes, **payload)
+    except EmptyRecording as e:
+        return {"status": "no_speech", "detail": str(e)}
+
+
+@router.post("/create")
+async def create_log_from_audio(
+    audio: UploadFile = File(...),
+    patient_id: str = Form(...),
+    nurse_id: str = Form(...),
+    shift_id: str = Form(...),
+    prescription_context: str = Form(default="none"),
+    stt_provider: str = Form(default="whisper"),
+    stt_language: str = Form(default="en"),
+    stt_mode: str = Form(default="transcribe"),
+    stt_model: str = Form(default="saaras:v3"),
+    pipeline_mode: str = Form(default=DEFAULT_PIPELINE_MODE),
+    async_mode: bool = Form(default=False),
+):
+    audio_bytes = await audio.read()
+    fields = {
+        "filename": audio.filename,
+        "patient_id": patient_id,
+        "nurse_id": nurse_id,
+        "shift_id": shift_id,
+        "prescription_context": prescription_context,
+        "stt_provider": stt_provider,
+        "stt_language": stt_language,
+        "stt_mode": stt_mode,
+        "stt_model": stt_model,
+        "pipeline_mode": pipeline_mode,
     }
-    
+
+    if async_mode:
+        # persist and hand off; the client polls /jobs/{id} or follows /jobs/{id}/events
+        job_id = await job_queue.enqueue("log", fields, audio_bytes)
+        return JSONResponse(status_code=202, content={
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/api/logs/jobs/{job_id}",
+            "events_url": f"/api/logs/jobs/{job_id}/events",
+        })
+
+    try:
+        return await process_audio_log(audio_bytes, **fields)
+    except EmptyRecording as e:
+        # rejected before any model ran
+        raise HTTPException(status_code=422, detail=str(e))
+
+@router.get("/cache/stats")
+async def get_result_cache_stats():
+    return result_cache.stats()
+
+@router.get("/jobs/{job_id}")
+async def get_log_job(job_id: str):
+    job = await job_queue.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/jobs/{job_id}/events")
+async def log_job_events(job_id: str, request: Request):
+    if not await job_queue.get_job(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        last_status = None
+        while not await request.is_disconnected():
+            job = await job_queue.get_job(job_id)
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield f"event: {last_status}\ndata: {json.dumps(job, default=str)}\n\n"
+            if last_status in ("done", "failed"):
+                return
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @router.get("/patient/{patient_id}")
-async def get_patient_logs(patient_id: str):
-    logs = await get_logs(patient_id)
-    return {"logs": logs, "count": len(logs)}
+async def get_patient_logs(
+    patient_id: str,
+    limit: int = Query(default=LOGS_PAGE_SIZE, ge=1, le=500),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False,
+):
+    logs = await get_logs(
+        patient_id,
+        limit=limit,
+        cursor=decode_cursor(cursor, LOG_CURSOR_COLUMNS),
+        columns=select_columns(fields, LOG_CURSOR_COLUMNS),
+    )
+    response = {
+        "logs": logs,
+        "count": len(logs),
+        "next_cursor": next_cursor(logs, limit, LOG_CURSOR_COLUMNS),
+    }
+    if include_total:
+        response["total"] = await count_logs(patient_id)
+    return response
+
+@router.patch("/{log_id}")
+async def edit_log(log_id: str, req: UpdateLogRequest):
+    values = {k: v for k, v in req.model_dump().items() if v is not None}
+    if not values:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+
+    updated = await update_log(log_id, values)
+    if not updated:
+        raise HTTPException(status_code=404, detail="Log not found")
+
+    # cached handoff summaries and the shift's rolling summary may quote the old text
+    await invalidate_patient(updated["patient_id"])
+    if updated.get("shift_id"):
+        await refold_shift(updated["shift_id"])
+    return {"log": updated}
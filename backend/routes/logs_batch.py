@@ -0,0 +1,149 @@
+import asyncio
+import json
+import os
+import time
+from typing import List
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.responses import StreamingResponse
+from services.audio import EmptyRecording
+from services.stt import transcribe_audio
+from services.db import save_logs
+from services.shift_summary import schedule_fold
+from routes.logs import run_llm_stages, _ms, PIPELINE_MODES, DEFAULT_PIPELINE_MODE
+
+router = APIRouter()
+
+# STT is CPU/GPU bound locally, the LLM stages are bounded by their provider limiters
+BATCH_STT_CONCURRENCY = int(os.getenv("BATCH_STT_CONCURRENCY", "2"))
+BATCH_ITEM_CONCURRENCY = int(os.getenv("BATCH_ITEM_CONCURRENCY", "8"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "50"))
+
+REQUIRED_FIELDS = ("patient_id", "nurse_id", "shift_id")
+
+
+async def _process_item(index: int, audio_bytes: bytes, filename: str, meta: dict, stt_slots, item_slots) -> dict:
+    async with item_slots:
+        start = time.perf_counter()
+        try:
+            async with stt_slots:
+                stt_result = await transcribe_audio(
+                    audio_bytes,
+                    filename,
+                    stt_provider=meta.get("stt_provider", "whisper"),
+                    language_hint=meta.get("stt_language", "en"),
+                    stt_mode=meta.get("stt_mode", "transcribe"),
+                    stt_model=meta.get("stt_model", "saaras:v3"),
+                )
+            timings = {"stt": _ms(start)}
+
+            mode = meta.get("pipeline_mode", DEFAULT_PIPELINE_MODE)
+            mode = mode if mode in PIPELINE_MODES else "two_stage"
+            clean, structured, stage_timings, _ = await run_llm_stages(
+                stt_result["transcript"], meta.get("prescription_context", "none"), mode,
+                patient_id=meta["patient_id"],
+            )
+            timings.update(stage_timings)
+        except EmptyRecording as e:
+            # nothing to log, and nothing a resend would change
+            return {"index": index, "client_ref": meta.get("client_ref"), "status": "no_speech", "detail": str(e)}
+        except Exception as e:
+            return {"index": index, "client_ref": meta.get("client_ref"), "status": "error", "detail": str(e)}
+
+        confidence = stt_result["confidence"]
+        return {
+            "index": index,
+            "client_ref": meta.get("client_ref"),
+            "status": "processed",
+            "raw_transcript": stt_result["transcript"],
+            "clean_transcript": clean,
+            "confidence": confidence,
+            "needs_review": confidence < 0.75,
+            "structured_log": structured,
+            "stt_provider": stt_result.get("provider"),
+            "timings_ms": timings,
+            "row": {
+                "patient_id": meta["patient_id"],
+                "nurse_id": meta["nurse_id"],
+                "shift_id": meta["shift_id"],
+                "raw_text": clean,
+                "structured_log": structured,
+                "confidence": confidence,
+                "needs_review": confidence < 0.75,
+            },
+        }
+
+
+async def _save_processed(results: list) -> list:
+    # single bulk insert for everything that made it through STT + LLM
+    processed = [r for r in results if r["status"] == "processed"]
+    saved_rows = await save_logs([r.pop("row") for r in processed])
+    for result, saved in zip(processed, saved_rows):
+        result["status"] = "saved"
+        result["saved"] = saved
+    for shift_id in {r["saved"]["shift_id"] for r in processed}:
+        schedule_fold(shift_id)
+    return results
+
+
+@router.post("/batch")
+async def create_logs_batch(
+    audios: List[UploadFile] = File(...),
+    items: str = Form(...),
+    stream: bool = Form(default=False),
+):
+    # items: JSON list, one object per audio in the same order, with the /create
+    # form fields (patient_id, nurse_id, shift_id required) and an optional client_ref
+    try:
+        metas = json.loads(items)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="items must be a JSON list")
+    if not isinstance(metas, list) or len(metas) != len(audios):
+        raise HTTPException(status_code=400, detail="items must have one entry per audio file")
+    if len(audios) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} notes per batch")
+    for i, meta in enumerate(metas):
+        missing = [f for f in REQUIRED_FIELDS if not meta.get(f)]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"item {i} is missing {', '.join(missing)}")
+
+    payloads = [(await audio.read(), audio.filename) for audio in audios]
+    stt_slots = asyncio.Semaphore(BATCH_STT_CONCURRENCY)
+    item_slots = asyncio.Semaphore(BATCH_ITEM_CONCURRENCY)
+    total_start = time.perf_counter()
+    tasks = [
+        asyncio.create_task(_process_item(i, data, name, meta, stt_slots, item_slots))
+        for i, ((data, name), meta) in enumerate(zip(payloads, metas))
+    ]
+
+    if not stream:
+        results = await _save_processed(list(await asyncio.gather(*tasks)))
+        return {
+            "results": results,
+            "saved": sum(1 for r in results if r["status"] == "saved"),
+            "failed": sum(1 for r in results if r["status"] == "error"),
+            "no_speech": sum(1 for r in results if r["status"] == "no_speech"),
+            "total_ms": _ms(total_start),
+        }
+
+    async def events():
+        # NDJSON: one line per item as it finishes processing, then the saved rows
+        results = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                results.append(result)
+                yield json.dumps({k: v for k, v in result.items() if k != "row"}) + "\n"
+            results = await _save_processed(results)
+            yield json.dumps({
+                "type": "saved",
+                "saved": [{"index": r["index"], "client_ref": r["client_ref"], "id": r["saved"]["id"]}
+                          for r in results if r["status"] == "saved"],
+                "failed": sum(1 for r in results if r["status"] == "error"),
+                "no_speech": sum(1 for r in results if r["status"] == "no_speech"),
+                "total_ms": _ms(total_start),
+            }) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
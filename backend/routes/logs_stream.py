@@ -0,0 +1,121 @@
+import asyncio
+import json
+import time
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from services.stt import transcribe_audio
+from services.audio import EmptyRecording, SilenceSegmenter, pcm16_to_wav
+from routes.logs import finish_log, _ms, DEFAULT_PIPELINE_MODE
+
+router = APIRouter()
+
+# Protocol:
+#   client → {"type": "start", "patient_id", "nurse_id", "shift_id", "sample_rate", ...create form fields}
+#   client → binary frames of 16-bit mono PCM while the nurse is speaking
+#   client → {"type": "end"}
+#   server → {"type": "partial", "segment", "text", "transcript"} as each pause-delimited segment is transcribed
+#   server → {"type": "final", ...same body as /api/logs/create}
+
+@router.websocket("/stream")
+async def stream_log(ws: WebSocket):
+    await ws.accept()
+    send_lock = asyncio.Lock()
+    tasks: list[asyncio.Task] = []
+
+    async def send(message: dict):
+        async with send_lock:
+            await ws.send_json(message)
+
+    try:
+        start_msg = await ws.receive_json()
+        if start_msg.get("type") != "start":
+            await send({"type": "error", "detail": "first message must be {\"type\": \"start\", ...}"})
+            await ws.close()
+            return
+        missing = [f for f in ("patient_id", "nurse_id", "shift_id") if not start_msg.get(f)]
+        if missing:
+            await send({"type": "error", "detail": f"start message is missing {', '.join(missing)}"})
+            await ws.close()
+            return
+
+        sample_rate = int(start_msg.get("sample_rate", 16000))
+        stt_kwargs = {
+            "stt_provider": start_msg.get("stt_provider", "whisper"),
+            "language_hint": start_msg.get("stt_language", "en"),
+            "stt_mode": start_msg.get("stt_mode", "transcribe"),
+            "stt_model": start_msg.get("stt_model", "saaras:v3"),
+        }
+        segmenter = SilenceSegmenter(sample_rate=sample_rate)
+        results: dict[int, dict] = {}
+
+        def joined() -> str:
+            return " ".join(results[i]["transcript"] for i in sorted(results) if results[i]["transcript"])
+
+        async def transcribe_segment(index: int, pcm: bytes):
+            try:
+                result = await transcribe_audio(pcm16_to_wav(pcm, sample_rate), f"segment-{index}.wav", **stt_kwargs)
+            except EmptyRecording:
+                return  # a blip the segmenter kept but too short to be speech
+            results[index] = result
+            await send({"type": "partial", "segment": index, "text": result["transcript"], "transcript": joined()})
+
+        def submit(segments: list):
+            for pcm in segments:
+                tasks.append(asyncio.create_task(transcribe_segment(len(tasks), pcm)))
+
+        await send({"type": "ready"})
+        while True:
+            message = await ws.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect()
+            if message.get("bytes"):
+                submit(segmenter.feed(message["bytes"]))
+            elif message.get("text") and json.loads(message["text"]).get("type") == "end":
+                break
+
+        total_start = time.perf_counter()
+        tail = segmenter.flush()
+        if tail:
+            submit([tail])
+        await asyncio.gather(*tasks)
+        timings = {"stt_tail": _ms(total_start)}
+
+        if not results:
+            await send({"type": "error", "detail": "No speech detected"})
+            await ws.close()
+            return
+
+        confidences = [r["confidence"] for r in results.values()]
+        first = results[min(results)]
+        stt_result = {
+            "transcript": joined(),
+            "confidence": round(sum(confidences) / len(confidences), 2),
+            "provider": first.get("provider"),
+            "language": first.get("language"),
+        }
+        final = await finish_log(
+            stt_result,
+            patient_id=start_msg["patient_id"],
+            nurse_id=start_msg["nurse_id"],
+            shift_id=start_msg["shift_id"],
+            prescription_context=start_msg.get("prescription_context", "none"),
+            pipeline_mode=start_msg.get("pipeline_mode", DEFAULT_PIPELINE_MODE),
+            stt_provider=stt_kwargs["stt_provider"],
+            stt_language=stt_kwargs["language_hint"],
+            timings=timings,
+            total_start=total_start,
+        )
+        await send({"type": "final", **final, "segments": len(results)})
+        await ws.close()
+    except WebSocketDisconnect:
+        pass  # nurse hung up mid-note
+    except Exception as e:
+        # a segment or the final clean/extract/save failed: tell the client instead of just dropping
+        try:
+            await send({"type": "error", "detail": str(e)})
+            await ws.close()
+        except Exception:
+            pass  # socket already gone
+    finally:
+        # drop any segment transcriptions still running
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,90 @@
+import time
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from starlette.datastructures import Headers, MutableHeaders
+from services import llm_gateway, metrics, result_cache
+from services.db import read_cache_stats
+from services.handoff_cache import summary_cache
+
+router = APIRouter()
+
+
+def _route_label(scope) -> str:
+    # template of the matched route, e.g. /api/logs/patient/{patient_id}; rebuilt from the
+    # path and its params so router prefixes are included however routes are nested
+    if scope.get("route") is None:
+        return "unmatched"
+    params = {str(v): k for k, v in (scope.get("path_params") or {}).items()}
+    return "/".join(f"{{{params[seg]}}}" if seg in params else seg for seg in scope["path"].split("/"))
+
+
+class RequestMetrics:
+    """ASGI middleware: latency per route template, finished with the response's last body chunk.
+
+    Streaming responses (SSE chat, job events, NDJSON batches) are timed to their end,
+    not to their headers. Route templates, not raw paths, keep label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timings = []
+        token = metrics.request_timings.set(timings)
+        metrics.gauge_add("nursesync_http_requests_in_flight", 1)
+        start = time.perf_counter()
+        status = 500
+        finished = False
+        server_timing = metrics.SERVER_TIMING or Headers(scope=scope).get("x-server-timing") == "1"
+
+        def finish():
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            metrics.gauge_add("nursesync_http_requests_in_flight", -1)
+            metrics.observe(
+                "nursesync_http_request_duration_seconds", time.perf_counter() - start,
+                method=scope["method"],
+                route=_route_label(scope),
+                status=str(status),
+            )
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if server_timing:
+                    # stages up to the headers; a streamed body's later stages land in the histogram only
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing", metrics.server_timing(timings, (time.perf_counter() - start) * 1000)
+                    )
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            # the app raised or ended without a final body chunk
+            finish()
+            metrics.request_timings.reset(token)
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    metrics.observe_caches({
+        "read": read_cache_stats(),
+        "handoff_summary": summary_cache.stats(),
+        **result_cache.stats(),
+    })
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/llm/health")
+def get_llm_health():
+    # circuit state, recent failures and running latency per provider
+    return llm_gateway.health()
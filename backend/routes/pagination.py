@@ -0,0 +1,45 @@
+import base64
+import json
+import re
+from fastapi import HTTPException
+
+_FIELD = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+def select_columns(fields: str | None, required: list) -> str:
+    # caller-chosen projection; cursor columns are always included so paging still works
+    if not fields:
+        return "*"
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    bad = [f for f in wanted if not _FIELD.match(f)]
+    if bad:
+        raise HTTPException(status_code=400, detail=f"Invalid fields: {', '.join(bad)}")
+    return ",".join(dict.fromkeys(required + wanted))
+
+
+def encode_cursor(row: dict, columns: list) -> str:
+    raw = json.dumps([row.get(col) for col in columns], default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None, columns: list) -> list | None:
+    # one scalar per cursor column, or the keyset filter cannot be built from it
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if (
+        not isinstance(values, list)
+        or len(values) != len(columns)
+        or not all(isinstance(v, (str, int, float)) and not isinstance(v, bool) for v in values)
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def next_cursor(rows: list, limit: int, columns: list) -> str | None:
+    # a full page means there may be more
+    return encode_cursor(rows[-1], columns) if rows and len(rows) == limit else None
@@ -1,43 +1,87 @@
-from fastapi import APIRouter, UploadFile, File, Form
-from services.db import save_prescription, get_all_patients, get_patient_by_id
+import asyncio
+import os
+import shutil
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, Form, Request, Query
+from services.db import save_prescription, get_all_patients, get_patient_by_id, get_prescriptions_by_patient, count_patients
+from routes.etag import etag_response
+from routes.pagination import select_columns, decode_cursor, next_cursor
+from services.prescription_index import schedule_parse
+from routes.uploads import check_content_type, safe_filename, hash_upload, content_tag, find_duplicate, UPLOAD_CHUNK_SIZE
 
 router = APIRouter()
 
+PATIENTS_PAGE_SIZE = int(os.getenv("PATIENTS_PAGE_SIZE", "200"))
+PATIENT_CURSOR_COLUMNS = ["name", "id"]
+PRESCRIPTION_DIR = "static/prescriptions"
+
+def _store(src, path: str):
+    os.makedirs(PRESCRIPTION_DIR, exist_ok=True)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(src, out, UPLOAD_CHUNK_SIZE)
+
 @router.post("/upload")
 async def upload_prescription(
     file: UploadFile = File(...),
     patient_id: str = Form(...)
 ):
-    content = await file.read()
-    
-    # save file to static folder
-    import os
-    os.makedirs("static/prescriptions", exist_ok=True)
-    file_path = f"static/prescriptions/{patient_id}_{file.filename}"
-    
-    with open(file_path, "wb") as f:
-        f.write(content)
+    check_content_type(file)
+    _, sha256 = await hash_upload(file)
+
+    existing = await find_duplicate(patient_id, sha256)
+    if existing:
+        return {
+            "message": "Prescription already uploaded ✅",
+            "file_url": existing["file_url"],
+            "saved": existing,
+            "deduplicated": True
+        }
+
+    # the one copy of the upload this route makes, off the event loop
+    stored_name = f"{safe_filename(patient_id)}_{content_tag(sha256)}_{safe_filename(file.filename)}"
+    stored_path = os.path.join(PRESCRIPTION_DIR, stored_name)
+    await asyncio.to_thread(_store, file.file, stored_path)
 
     # save reference in DB
     saved = await save_prescription(
         patient_id=patient_id,
-        file_url=f"/static/prescriptions/{patient_id}_{file.filename}",
+        file_url=f"/static/prescriptions/{stored_name}",
         filename=file.filename
     )
 
+    # parse into the patient's medication schedule in the background
+    parse_job_id = await schedule_parse(saved["id"], patient_id, {"path": stored_path}, file.content_type)
+
     return {
         "message": "Prescription uploaded ✅",
-        "file_url": f"/static/prescriptions/{patient_id}_{file.filename}",
-        "saved": saved
+        "file_url": f"/static/prescriptions/{stored_name}",
+        "saved": saved,
+        "deduplicated": False,
+        "parse_job_id": parse_job_id
     }
 
 @router.get("/")
-async def list_patients():
-    patients = await get_all_patients()
-    return {"patients": patients}
+async def list_patients(
+    request: Request,
+    limit: int = Query(default=PATIENTS_PAGE_SIZE, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False,
+):
+    patients = await get_all_patients(
+        limit=limit,
+        cursor=decode_cursor(cursor, PATIENT_CURSOR_COLUMNS),
+        columns=select_columns(fields, PATIENT_CURSOR_COLUMNS),
+    )
+    body = {
+        "patients": patients,
+        "next_cursor": next_cursor(patients, limit, PATIENT_CURSOR_COLUMNS),
+    }
+    if include_total:
+        body["total"] = await count_patients()
+    return etag_response(request, body)
 
 @router.get("/{patient_id}")
-async def get_prescriptions(patient_id: str):
-    from services.db import get_prescriptions_by_patient
+async def get_prescriptions(patient_id: str, request: Request):
     prescriptions = await get_prescriptions_by_patient(patient_id)
-    return {"prescriptions": prescriptions}
\ No newline at end of file
+    return etag_response(request, {"prescriptions": prescriptions})
\ No newline at end of file
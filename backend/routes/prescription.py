@@ -1,48 +1,71 @@
-from fastapi import APIRouter, UploadFile, File, Form
-from services.db import supabase
-import uuid
+from fastapi import APIRouter, UploadFile, File, Form, Request
+from services.db import upload_to_storage, save_prescription, get_prescriptions_by_patient
+from routes.etag import etag_response
+from services.prescription_index import schedule_parse, patient_schedule
+from routes.uploads import check_content_type, safe_filename, hash_upload, iter_file, content_tag, find_duplicate
 
 router = APIRouter()
 
 @router.post("/parse")
 async def upload_prescription(
     file: UploadFile = File(...),
-    patient_id: str = Form(default="none")
+    patient_id: str = Form(...)
 ):
-    content = await file.read()
-    
-    # unique filename so it never overwrites
-    ext = file.filename.split(".")[-1]
-    unique_name = f"{patient_id}/{uuid.uuid4()}.{ext}"
-    
-    # upload to supabase storage
-    supabase.storage.from_("prescriptions").upload(
-        path=unique_name,
-        file=content,
-        file_options={"content-type": file.content_type}
+    check_content_type(file)
+    filename = safe_filename(file.filename)
+    size, sha256 = await hash_upload(file)
+
+    # same scan uploaded twice (retries, double taps) is stored once
+    existing = await find_duplicate(patient_id, sha256)
+    if existing:
+        return {
+            "raw": "Prescription already uploaded",
+            "filename": existing.get("filename", filename),
+            "file_url": existing["file_url"],
+            "sha256": sha256,
+            "deduplicated": True
+        }
+
+    # content-addressed name, unique per distinct file
+    ext = filename.rsplit(".", 1)[-1] if "." in filename else "bin"
+    unique_name = f"{patient_id}/{content_tag(sha256)}.{ext}"
+
+    # stream the spooled upload to supabase storage, get public URL back
+    public_url = await upload_to_storage(
+        "prescriptions",
+        unique_name,
+        iter_file(file.file),
+        content_type=file.content_type,
+        size=size
     )
-    
-    # get public URL
-    public_url = supabase.storage.from_("prescriptions").get_public_url(unique_name)
-    
+
     # save reference in DB
-    supabase.table("prescriptions").insert({
-        "patient_id": patient_id,
-        "file_url": public_url,
-        "filename": file.filename
-    }).execute()
+    saved = await save_prescription(
+        patient_id=patient_id,
+        file_url=public_url,
+        filename=filename
+    )
+
+    # parse into the patient's medication schedule in the background
+    parse_job_id = await schedule_parse(
+        saved["id"], patient_id, {"bucket": "prescriptions", "object": unique_name}, file.content_type
+    )
 
     return {
         "raw": "Prescription uploaded successfully",
-        "filename": file.filename,
-        "file_url": public_url
+        "filename": filename,
+        "file_url": public_url,
+        "sha256": sha256,
+        "deduplicated": False,
+        "parse_job_id": parse_job_id
     }
 
+@router.get("/{patient_id}/schedule")
+async def get_schedule(patient_id: str):
+    # parsed medications plus doses past their round with nothing logged
+    return await patient_schedule(patient_id)
+
 @router.get("/{patient_id}")
-async def get_prescriptions(patient_id: str):
-    result = supabase.table("prescriptions")\
-        .select("*")\
-        .eq("patient_id", patient_id)\
-        .order("created_at", desc=True)\
-        .execute()
-    return {"prescriptions": result.data}
\ No newline at end of file
+async def get_prescriptions(patient_id: str, request: Request):
+    prescriptions = await get_prescriptions_by_patient(patient_id)
+    return etag_response(request, {"prescriptions": prescriptions})
\ No newline at end of file
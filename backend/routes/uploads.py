@@ -0,0 +1,104 @@
+import asyncio
+import hashlib
+import os
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from services.db import get_prescriptions_by_patient
+
+PRESCRIPTION_MAX_BYTES = int(float(os.getenv("PRESCRIPTION_MAX_MB", "20")) * 1024 * 1024)
+PRESCRIPTION_CONTENT_TYPES = {
+    t.strip() for t in os.getenv(
+        "PRESCRIPTION_CONTENT_TYPES",
+        "application/pdf,image/jpeg,image/png,image/webp,image/heic,application/octet-stream",
+    ).split(",") if t.strip()
+}
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_KB", "256")) * 1024
+
+# multipart boundaries and the small form fields around the file
+FORM_OVERHEAD_BYTES = 64 * 1024
+UPLOAD_PATHS = {"/api/patients/upload", "/api/prescription/parse"}
+
+
+class UploadSizeLimit:
+    """ASGI middleware capping upload request bodies before multipart parsing spools them.
+
+    A declared Content-Length over the limit is refused without reading the body;
+    chunked bodies are counted as they arrive and cut off once they cross it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in UPLOAD_PATHS:
+            return await self.app(scope, receive, send)
+        limit = PRESCRIPTION_MAX_BYTES + FORM_OVERHEAD_BYTES
+        length = Headers(scope=scope).get("content-length")
+        if length and length.isdigit() and int(length) > limit:
+            response = JSONResponse(status_code=413, content={"detail": _too_large()})
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def capped_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=_too_large())
+            return message
+
+        await self.app(scope, capped_receive, send)
+
+
+def _too_large() -> str:
+    return f"File exceeds the {PRESCRIPTION_MAX_BYTES // (1024 * 1024)} MB upload limit"
+
+
+def check_content_type(file: UploadFile):
+    content_type = (file.content_type or "application/octet-stream").split(";")[0].strip()
+    if content_type not in PRESCRIPTION_CONTENT_TYPES:
+        raise HTTPException(status_code=415, detail=f"Unsupported file type: {content_type}")
+
+
+def safe_filename(filename: str | None) -> str:
+    return os.path.basename((filename or "upload").replace("\\", "/")) or "upload"
+
+
+async def hash_upload(file: UploadFile) -> tuple[int, str]:
+    """Size and sha256 hex of an upload, read chunk by chunk off the event loop.
+
+    Hashes the file Starlette already spooled rather than copying it again,
+    then rewinds it for whoever reads it next.
+    """
+    f = file.file
+    digest = hashlib.sha256()
+    size = 0
+    while chunk := await asyncio.to_thread(f.read, UPLOAD_CHUNK_SIZE):
+        size += len(chunk)
+        digest.update(chunk)
+    await asyncio.to_thread(f.seek, 0)
+    if size == 0:
+        raise HTTPException(status_code=400, detail="Empty file")
+    if size > PRESCRIPTION_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=_too_large())
+    return size, digest.hexdigest()
+
+
+async def iter_file(f):
+    # stream an open upload onwards (e.g. to storage) without loading it whole
+    while chunk := await asyncio.to_thread(f.read, UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+
+def content_tag(sha256: str) -> str:
+    # short content hash embedded in stored names, so duplicates are found by URL
+    return sha256[:16]
+
+
+async def find_duplicate(patient_id: str, sha256: str) -> dict | None:
+    tag = content_tag(sha256)
+    prescriptions = await get_prescriptions_by_patient(patient_id)
+    return next((p for p in prescriptions if tag in (p.get("file_url") or "")), None)
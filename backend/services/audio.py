@@ -0,0 +1,254 @@
+import functools
+import io
+import math
+import os
+import subprocess
+import time
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+# trim leading/trailing silence before STT. Speech is judged against the recording
+# itself: a frame is speech when it is this far above the noise floor (the
+# NOISE_FLOOR_PERCENTILE frame level), so quiet voices and low-gain mics still pass
+SPEECH_ABOVE_FLOOR_DB = float(os.getenv("AUDIO_SPEECH_ABOVE_FLOOR_DB", "12"))
+NOISE_FLOOR_PERCENTILE = 10
+# ...and above this absolute level (about -60 dBFS), so hiss on a silent take never counts.
+# Anything at or above SPEECH_LEVEL (about -40 dBFS, the old fixed gate) always counts,
+# so a take with no pauses to measure a floor from is not rejected either
+SPEECH_MIN_LEVEL = float(os.getenv("AUDIO_SPEECH_MIN_LEVEL", "0.001"))
+SPEECH_LEVEL = float(os.getenv("AUDIO_SPEECH_LEVEL", "0.01"))
+# speech kept on either side of the detected bounds so soft word edges survive
+TRIM_PAD_MS = int(os.getenv("AUDIO_TRIM_PAD_MS", "250"))
+# recordings with less speech than this are rejected before any model runs
+MIN_SPEECH_MS = int(os.getenv("AUDIO_MIN_SPEECH_MS", "300"))
+TRIM_FRAME_MS = 30
+
+_PCM_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+# windowed-sinc resampler: half-width in zero crossings, cutoff as a fraction of the
+# lower Nyquist rate (the rest is transition band), Kaiser window shape
+RESAMPLE_ZEROS = 16
+RESAMPLE_ROLLOFF = 0.94
+RESAMPLE_KAISER_BETA = 8.6
+RESAMPLE_BLOCK = 8192
+
+
+@functools.lru_cache(maxsize=8)
+def _resample_bank(up: int, down: int) -> tuple[np.ndarray, int]:
+    """Kaiser-windowed sinc low-pass, one row of taps per output phase, plus its half-width.
+
+    The cutoff sits just under the lower of the two Nyquist rates, so content the
+    16 kHz output cannot carry is filtered out instead of folding into speech.
+    """
+    cutoff = 0.5 * RESAMPLE_ROLLOFF * min(1.0, up / down)  # cycles per input sample
+    half = int(np.ceil(RESAMPLE_ZEROS / (2 * cutoff)))
+    x = np.arange(up)[:, None] / up - np.arange(-half + 1, half + 1)[None, :]
+    window = np.i0(RESAMPLE_KAISER_BETA * np.sqrt(np.clip(1 - (x / half) ** 2, 0, None))) / np.i0(RESAMPLE_KAISER_BETA)
+    bank = 2 * cutoff * np.sinc(2 * cutoff * x) * window
+    bank /= bank.sum(axis=1, keepdims=True)  # unity gain at DC for every phase
+    return bank.astype(np.float32), half
+
+
+def _resample(samples: np.ndarray, rate: int) -> np.ndarray:
+    # polyphase resampling by the reduced ratio SAMPLE_RATE/rate, in blocks to bound memory
+    if rate == SAMPLE_RATE or samples.size == 0:
+        return samples
+    g = math.gcd(SAMPLE_RATE, rate)
+    up, down = SAMPLE_RATE // g, rate // g
+    bank, half = _resample_bank(up, down)
+    padded = np.pad(samples.astype(np.float32), (half, half))
+    taps = np.arange(1, 2 * half + 1)
+    out = np.empty(samples.size * up // down, dtype=np.float32)
+    for start in range(0, out.size, RESAMPLE_BLOCK):
+        pos = np.arange(start, min(start + RESAMPLE_BLOCK, out.size), dtype=np.int64) * down
+        window = padded[(pos // up)[:, None] + taps]
+        out[start:start + pos.size] = np.einsum("ij,ij->i", window, bank[pos % up])
+    return out
+
+
+def _decode_wav(audio_bytes: bytes) -> np.ndarray:
+    with wave.open(io.BytesIO(audio_bytes), "rb") as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+
+    if width == 3:
+        # 24-bit PCM: widen to int32 by padding the low byte
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        padded = np.zeros((raw.shape[0], 4), dtype=np.uint8)
+        padded[:, 1:] = raw
+        samples = padded.view("<i4").reshape(-1).astype(np.float32) / 2 ** 31
+    elif width in _PCM_DTYPES:
+        dtype = _PCM_DTYPES[width]
+        samples = np.frombuffer(frames, dtype=dtype).astype(np.float32)
+        if width == 1:
+            samples = (samples - 128) / 128
+        else:
+            samples /= float(2 ** (8 * width - 1))
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width}")
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return _resample(samples, rate)
+
+
+def _decode_with_ffmpeg(audio_bytes: bytes) -> np.ndarray:
+    # same conversion whisper.load_audio does, but piped instead of via a file
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE),
+        "pipe:1",
+    ]
+    try:
+        out = subprocess.run(cmd, input=audio_bytes, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode audio: {e.stderr.decode(errors='ignore')}") from e
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+
+def decode_audio(audio_bytes: bytes) -> np.ndarray:
+    """Decode uploaded audio bytes to a 16 kHz mono float32 array without touching disk."""
+    if audio_bytes[:4] == b"RIFF" and audio_bytes[8:12] == b"WAVE":
+        try:
+            return _decode_wav(audio_bytes)
+        except (wave.Error, ValueError):
+            pass  # e.g. float/extensible WAV, let ffmpeg handle it
+    return _decode_with_ffmpeg(audio_bytes)
+
+
+# compressed uploads (webm/opus, m4a) run at roughly this many bytes per second of speech
+COMPRESSED_BYTES_PER_SECOND = 16000
+
+
+def estimate_duration(audio_bytes: bytes) -> float:
+    """Seconds of audio: exact for WAV (header only), a bitrate guess for anything else."""
+    if audio_bytes[:4] == b"RIFF" and audio_bytes[8:12] == b"WAVE":
+        try:
+            with wave.open(io.BytesIO(audio_bytes), "rb") as wav:
+                return wav.getnframes() / wav.getframerate()
+        except (wave.Error, ValueError, ZeroDivisionError):
+            pass
+    return len(audio_bytes) / COMPRESSED_BYTES_PER_SECOND
+
+
+def pcm16_to_wav(pcm: bytes, sample_rate: int = SAMPLE_RATE) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buf.getvalue()
+
+
+class SilenceSegmenter:
+    """Splits a live 16-bit mono PCM stream into utterances at pauses, using frame RMS energy."""
+
+    def __init__(
+        self,
+        sample_rate: int = SAMPLE_RATE,
+        silence_ms: int = 600,
+        threshold: float = 0.01,
+        max_segment_s: float = 25,
+        frame_ms: int = 30,
+    ):
+        self.frame_bytes = int(sample_rate * frame_ms / 1000) * 2
+        self.silence_frames = max(1, silence_ms // frame_ms)
+        self.max_frames = int(max_segment_s * 1000 / frame_ms)
+        self.threshold = threshold
+        self.buffer = bytearray()
+        self.segment = bytearray()
+        self.frames_in_segment = 0
+        self.trailing_silence = 0
+        self.in_speech = False
+
+    def _close(self) -> bytes:
+        segment = bytes(self.segment)
+        self.segment = bytearray()
+        self.frames_in_segment = 0
+        self.trailing_silence = 0
+        self.in_speech = False
+        return segment
+
+    def feed(self, pcm: bytes) -> list[bytes]:
+        """Add audio; returns any segments that closed as a result."""
+        self.buffer.extend(pcm)
+        closed = []
+        while len(self.buffer) >= self.frame_bytes:
+            frame = bytes(self.buffer[:self.frame_bytes])
+            del self.buffer[:self.frame_bytes]
+            samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32) / 32768.0
+            loud = float(np.sqrt(np.mean(samples ** 2))) >= self.threshold
+
+            if not self.in_speech:
+                if not loud:
+                    continue  # leading silence is dropped
+                self.in_speech = True
+
+            self.segment.extend(frame)
+            self.frames_in_segment += 1
+            self.trailing_silence = 0 if loud else self.trailing_silence + 1
+            if self.trailing_silence >= self.silence_frames or self.frames_in_segment >= self.max_frames:
+                closed.append(self._close())
+        return closed
+
+    def flush(self) -> bytes | None:
+        """Close whatever is left once the stream ends."""
+        if self.in_speech:
+            self.segment.extend(self.buffer[:len(self.buffer) - len(self.buffer) % 2])
+        self.buffer = bytearray()
+        return self._close() if self.in_speech and self.segment else None
+
+
+class EmptyRecording(ValueError):
+    """The upload decoded fine but holds no speech."""
+
+
+def speech_threshold(rms: np.ndarray) -> float:
+    # relative to the recording's own noise floor, clamped to [SPEECH_MIN_LEVEL, SPEECH_LEVEL]
+    floor = float(np.percentile(rms, NOISE_FLOOR_PERCENTILE))
+    return min(SPEECH_LEVEL, max(SPEECH_MIN_LEVEL, floor * 10 ** (SPEECH_ABOVE_FLOOR_DB / 20)))
+
+
+def speech_bounds(samples: np.ndarray) -> tuple[int, int, int] | None:
+    """(first, last, loud frame count) in samples for 16 kHz audio, or None if no frame is loud."""
+    frame = SAMPLE_RATE * TRIM_FRAME_MS // 1000
+    usable = samples.size - samples.size % frame
+    if usable == 0:
+        return None
+    rms = np.sqrt(np.mean(samples[:usable].reshape(-1, frame) ** 2, axis=1))
+    loud = np.flatnonzero(rms >= speech_threshold(rms))
+    if loud.size == 0:
+        return None
+    return int(loud[0]) * frame, int(loud[-1] + 1) * frame, int(loud.size)
+
+
+def preprocess_audio(audio_bytes: bytes) -> tuple[bytes, dict]:
+    """Normalise an upload to 16 kHz mono PCM16 WAV with leading/trailing silence trimmed.
+
+    Returns (wav bytes, report). Raises EmptyRecording when there is less than
+    MIN_SPEECH_MS of audio above the speech threshold.
+    """
+    start = time.perf_counter()
+    samples = decode_audio(audio_bytes)
+    input_s = samples.size / SAMPLE_RATE
+    bounds = speech_bounds(samples)
+    if bounds is None or bounds[2] * TRIM_FRAME_MS < MIN_SPEECH_MS:
+        raise EmptyRecording(f"No speech detected in {input_s:.1f} s recording")
+
+    pad = SAMPLE_RATE * TRIM_PAD_MS // 1000
+    first, last = max(0, bounds[0] - pad), min(samples.size, bounds[1] + pad)
+    pcm = (np.clip(samples[first:last], -1, 1) * 32767).astype("<i2").tobytes()
+    kept_s = (last - first) / SAMPLE_RATE
+    return pcm16_to_wav(pcm), {
+        "input_s": round(input_s, 2),
+        "kept_s": round(kept_s, 2),
+        "trimmed_s": round(input_s - kept_s, 2),
+        "preprocess_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
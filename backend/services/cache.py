@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+from services.db_backend import get_backend
+
+
+class DBStore:
+    """Persistent cache tier in a DB table with columns key, grp, value, expires_at."""
+
+    def __init__(self, table: str):
+        self.table = table
+
+    async def get(self, key: str):
+        rows = await get_backend().select(self.table, eq={"key": key}, limit=1)
+        if not rows:
+            return None
+        row = rows[0]
+        if row.get("expires_at") and row["expires_at"] < time.time():
+            await get_backend().delete(self.table, eq={"key": key})
+            return None
+        return row["value"]
+
+    async def set(self, key: str, value, group: str = None, ttl: float = None):
+        await get_backend().delete(self.table, eq={"key": key})
+        await get_backend().insert(self.table, {
+            "key": key,
+            "grp": group,
+            "value": value,
+            "expires_at": time.time() + ttl if ttl else None,
+        })
+
+    async def delete_group(self, group: str):
+        await get_backend().delete(self.table, eq={"grp": group})
+
+
+class DiskStore:
+    """Local on-disk cache tier: one JSON file per key, oldest files evicted past max_bytes."""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+    def _read(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        expired = entry.get("expires_at") and entry["expires_at"] < time.time()
+        try:
+            if expired:
+                os.remove(path)
+            else:
+                os.utime(path)  # keeps eviction least-recently-used
+        except OSError:
+            pass  # another worker evicted it between the read and here
+        return None if expired else entry["value"]
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue  # another worker evicted it first
+            entries.append((st.st_mtime, st.st_size, path))
+        self._size = 0
+        for _, size, path in sorted(entries, reverse=True):
+            if self._size + size <= self.max_bytes:
+                self._size += size
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _write(self, key: str, value, ttl: float):
+        os.makedirs(self.directory, exist_ok=True)
+        data = json.dumps({"key": key, "value": value, "expires_at": time.time() + ttl if ttl else None})
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        if self._size is None or self._size + len(data) > self.max_bytes:
+            self._evict()
+        else:
+            self._size += len(data)
+
+    async def get(self, key: str):
+        return await asyncio.to_thread(self._read, key)
+
+    async def set(self, key: str, value, group: str = None, ttl: float = None):
+        await asyncio.to_thread(self._write, key, value, ttl)
+
+    async def delete_group(self, group: str):
+        pass  # content-addressed entries never go stale
+
+
+class TTLCache:
+    """In-process LRU with optional TTL, optionally backed by a slower persistent store."""
+
+    def __init__(self, maxsize: int = 256, ttl: float = None, store=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.store = store
+        self.entries: OrderedDict = OrderedDict()  # key -> (expires_at, group, value)
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    def _put(self, key: str, value, group: str = None):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        self.entries[key] = (expires_at, group, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    async def get(self, key: str, group: str = None):
+        entry = self.entries.get(key)
+        if entry is not None:
+            expires_at, _, value = entry
+            if expires_at is None or expires_at > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self.entries[key]
+
+        if self.store is not None:
+            value = await self.store.get(key)
+            if value is not None:
+                self._put(key, value, group)
+                self.hits += 1
+                self.store_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value, group: str = None):
+        self._put(key, value, group)
+        if self.store is not None:
+            await self.store.set(key, value, group=group, ttl=self.ttl)
+
+    async def invalidate(self, group: str):
+        for key in [k for k, (_, g, _) in self.entries.items() if g == group]:
+            del self.entries[key]
+        if self.store is not None:
+            await self.store.delete_group(group)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "size": len(self.entries),
+        }
@@ -0,0 +1,82 @@
+import asyncio
+import os
+
+from services.cache import TTLCache, DBStore
+from services.llm_gateway import summarize_conversation
+from services.locks import KeyedLocks
+
+# recent messages kept verbatim; anything older is folded into the session summary
+CHAT_WINDOW_MESSAGES = int(os.getenv("CHAT_WINDOW_MESSAGES", "12"))
+CHAT_SESSION_MAX = int(os.getenv("CHAT_SESSION_MAX", "1000"))
+CHAT_SESSION_TTL = float(os.getenv("CHAT_SESSION_TTL", str(12 * 3600)))
+# "db" also persists sessions in the chat_sessions table so they survive restarts
+CHAT_SESSION_STORE = os.getenv("CHAT_SESSION_STORE", "memory").strip().lower()
+
+sessions = TTLCache(
+    maxsize=CHAT_SESSION_MAX,
+    ttl=CHAT_SESSION_TTL,
+    store=DBStore("chat_sessions") if CHAT_SESSION_STORE == "db" else None,
+)
+
+_locks = KeyedLocks()
+_tasks: set = set()
+
+
+async def load_session(session_id: str = None, seed_history: list = None) -> tuple[str | None, dict]:
+    """Returns (session_id, session); an unknown id starts a stored session seeded with seed_history.
+
+    Without an id nothing is stored: the client owns its history and the
+    session only lives for this request, so it is never compacted either.
+    """
+    if not session_id:
+        return None, {"summary": "", "messages": list(seed_history or []), "stateless": True}
+    session = await sessions.get(session_id)
+    if session is not None:
+        return session_id, session
+    session = {"summary": "", "messages": list(seed_history or [])}
+    await sessions.set(session_id, session)
+    return session_id, session
+
+
+def prompt_history(session: dict) -> list:
+    if session.get("stateless"):
+        # nothing summarised the older turns, so the client's history goes in whole
+        return session["messages"]
+    history = []
+    if session["summary"]:
+        history.append({"role": "system", "content": f"Summary of the earlier conversation: {session['summary']}"})
+    return history + session["messages"][-CHAT_WINDOW_MESSAGES:]
+
+
+async def _compact(session_id: str):
+    async with _locks.hold(session_id):
+        session = await sessions.get(session_id)
+        if session is None or len(session["messages"]) <= CHAT_WINDOW_MESSAGES:
+            return
+        overflow = session["messages"][:-CHAT_WINDOW_MESSAGES]
+        try:
+            summary = await summarize_conversation(session["summary"], overflow)
+        except Exception as e:
+            print(f"⚠️  compacting chat session {session_id} failed: {e}")
+            return
+        # re-read: a turn may have been recorded while the summary was generating
+        session = await sessions.get(session_id) or session
+        session["summary"] = summary
+        session["messages"] = session["messages"][len(overflow):]
+        await sessions.set(session_id, session)
+
+
+async def record_turn(session_id: str | None, session: dict, message: str, reply: str):
+    if session_id is None:
+        return
+    session["messages"] += [
+        {"role": "user", "content": message},
+        {"role": "assistant", "content": reply}
+    ]
+    await sessions.set(session_id, session)
+
+    if len(session["messages"]) > CHAT_WINDOW_MESSAGES and not _locks.locked(session_id):
+        # summarise off the request path; the window keeps the next prompt bounded meanwhile
+        task = asyncio.create_task(_compact(session_id))
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
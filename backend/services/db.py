@@ -1,13 +1,31 @@
-from supabase import create_client
 import os
-from dotenv import load_dotenv
+import inspect
+from services.db_backend import get_backend, DB_BACKEND
+from services.cache import TTLCache
+from services.metrics import stage, timed
+
+# patients and prescriptions change rarely; reads go through this cache and
+# writes below invalidate the affected entries
+_read_cache = TTLCache(
+    maxsize=int(os.getenv("READ_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("READ_CACHE_TTL", "60")),
+)
 
-load_dotenv()
+# readers served through _cached; only their loads are timed, so cache hits don't dilute db.<name>
+_CACHED_READERS = {"get_all_patients", "get_patient_by_id", "get_prescriptions_by_patient", "get_medication_schedule"}
+
+async def _cached(name: str, key: str, group: str, load):
+    value = await _read_cache.get(key, group=group)
+    if value is None:
+        with stage(f"db.{name}", DB_BACKEND):
+            value = await load()
+        if value is not None:
+            await _read_cache.set(key, value, group=group)
+    return value
+
+def read_cache_stats() -> dict:
+    return _read_cache.stats()
 
-supabase = create_client(
-    os.getenv("SUPABASE_URL"),
-    os.getenv("SUPABASE_KEY")
-)
 
 async def save_log(
     patient_id: str,
@@ -18,7 +36,7 @@ async def save_log(
     needs_review: bool,
     shift_id: str
 ) -> dict:
-    result = supabase.table("logs").insert({
+    result = await get_backend().insert("logs", {
         "patient_id": patient_id,
         "nurse_id": nurse_id,
         "raw_text": raw_text,
@@ -26,38 +44,52 @@ async def save_log(
         "confidence": confidence,
         "needs_review": needs_review,
         "shift_id": shift_id
-    }).execute()
-    return result.data[0]
+    })
+    return result[0]
 
-async def get_logs(patient_id: str) -> list:
-    result = supabase.table("logs")\
-        .select("*")\
-        .eq("patient_id", patient_id)\
-        .order("created_at", desc=True)\
-        .execute()
-    return result.data
+async def save_logs(rows: list) -> list:
+    # one round trip for a whole batch of log rows (same columns as save_log)
+    if not rows:
+        return []
+    return await get_backend().insert("logs", rows)
+
+async def get_logs(patient_id: str, limit: int = None, cursor: list = None, columns: str = "*") -> list:
+    # newest first; (created_at, id) makes the keyset cursor unique
+    return await get_backend().select(
+        "logs",
+        columns=columns,
+        eq={"patient_id": patient_id},
+        order=["created_at", "id"], desc=True,
+        limit=limit, cursor=cursor
+    )
+
+async def count_logs(patient_id: str) -> int:
+    return await get_backend().count("logs", eq={"patient_id": patient_id})
+
+async def update_log(log_id: str, values: dict) -> dict:
+    result = await get_backend().update("logs", values, eq={"id": log_id})
+    return result[0] if result else None
 
 async def start_shift(nurse_id: str):
-    result = supabase.table("shifts").insert({
+    result = await get_backend().insert("shifts", {
         "nurse_id": nurse_id,
         "status": "active"
-    }).execute()
-    return result.data[0]
+    })
+    return result[0]
 
-async def get_logs_by_shift(shift_id: str) -> list:
-    result = supabase.table("logs")\
-        .select("*")\
-        .eq("shift_id", shift_id)\
-        .order("created_at", desc=False)\
-        .execute()
-    return result.data
+async def get_logs_by_shift(shift_id: str, columns: str = "*") -> list:
+    return await get_backend().select(
+        "logs",
+        columns=columns,
+        eq={"shift_id": shift_id},
+        order="created_at", desc=False
+    )
 
 async def update_shift_status(shift_id: str, status: str):
-    supabase.table("shifts").update({"status": status})\
-        .eq("id", shift_id).execute()
+    await get_backend().update("shifts", {"status": status}, eq={"id": shift_id})
 
 async def save_handoff(outgoing_nurse_id, shift_id, summary_text, audio_url, pending_tasks, high_priority):
-    result = supabase.table("handoffs").insert({
+    result = await get_backend().insert("handoffs", {
         "outgoing_nurse_id": outgoing_nurse_id,
         "shift_id": shift_id,
         "summary_text": summary_text,
@@ -65,74 +97,141 @@ async def save_handoff(outgoing_nurse_id, shift_id, summary_text, audio_url, pen
         "pending_tasks": pending_tasks,
         "high_priority": high_priority,
         "status": "pending"
-    }).execute()
-    return result.data[0]
+    })
+    return result[0]
 
 async def get_pending_handoff():
-    result = supabase.table("handoffs")\
-        .select("*")\
-        .eq("status", "pending")\
-        .order("created_at", desc=True)\
-        .limit(1)\
-        .execute()
-    return result.data[0] if result.data else None
+    result = await get_backend().select(
+        "handoffs",
+        eq={"status": "pending"},
+        order="created_at", desc=True,
+        limit=1
+    )
+    return result[0] if result else None
 
 async def accept_handoff(handoff_id: str, incoming_nurse_id: str):
-    supabase.table("handoffs").update({
+    await get_backend().update("handoffs", {
         "incoming_nurse_id": incoming_nurse_id,
         "status": "accepted"
-    }).eq("id", handoff_id).execute()
-    
-async def get_all_patients() -> list:
-    result = supabase.table("patients")\
-        .select("*")\
-        .order("name", desc=False)\
-        .execute()
-    return result.data
+    }, eq={"id": handoff_id})
+
+async def get_all_patients(limit: int = None, cursor: list = None, columns: str = "*") -> list:
+    return await _cached(
+        "get_all_patients", f"patients:{columns}:{limit}:{cursor}", "patients",
+        lambda: get_backend().select(
+            "patients",
+            columns=columns,
+            order=["name", "id"], desc=False,
+            limit=limit, cursor=cursor
+        )
+    )
+
+async def count_patients() -> int:
+    return await get_backend().count("patients")
 
 async def get_patient_by_id(patient_id: str) -> dict:
-    result = supabase.table("patients")\
-        .select("*")\
-        .eq("id", patient_id)\
-        .single()\
-        .execute()
-    return result.data
+    async def load():
+        result = await get_backend().select("patients", eq={"id": patient_id}, limit=1)
+        return result[0] if result else None
+    return await _cached("get_patient_by_id", f"patient:{patient_id}", "patients", load)
+
 async def save_prescription(patient_id: str, file_url: str, filename: str):
-    result = supabase.table("prescriptions").insert({
+    result = await get_backend().insert("prescriptions", {
         "patient_id": patient_id,
         "file_url": file_url,
         "filename": filename
-    }).execute()
-    return result.data[0]
+    })
+    await _read_cache.invalidate(f"prescriptions:{patient_id}")
+    return result[0]
 
 async def get_prescriptions_by_patient(patient_id: str):
-    result = supabase.table("prescriptions")\
-        .select("*")\
-        .eq("patient_id", patient_id)\
-        .order("created_at", desc=True)\
-        .execute()
-    return result.data
+    return await _cached(
+        "get_prescriptions_by_patient", f"prescriptions:{patient_id}", f"prescriptions:{patient_id}",
+        lambda: get_backend().select(
+            "prescriptions",
+            eq={"patient_id": patient_id},
+            order="created_at", desc=True
+        )
+    )
+
+async def save_medication_schedule(patient_id: str, prescription_id: str, items: list) -> list:
+    # one row per parsed medication; re-parsing a prescription replaces its rows
+    await get_backend().delete("medication_schedule", eq={"prescription_id": prescription_id})
+    result = []
+    if items:
+        result = await get_backend().insert("medication_schedule", [
+            {"patient_id": patient_id, "prescription_id": prescription_id, **item}
+            for item in items
+        ])
+    await _read_cache.invalidate(f"schedule:{patient_id}")
+    return result
+
+def _latest_per_drug(rows: list) -> list:
+    # a newer prescription supersedes older rows for the same drug; rows within one prescription all stay
+    newest = {row["drug"]: row["prescription_id"] for row in rows}
+    return [row for row in rows if newest[row["drug"]] == row["prescription_id"]]
+
+async def get_medication_schedule(patient_id: str) -> list:
+    async def load():
+        return _latest_per_drug(await get_backend().select(
+            "medication_schedule",
+            columns="drug,dose,frequency,route,prescription_id",
+            eq={"patient_id": patient_id},
+            order="created_at"
+        ))
+    return await _cached("get_medication_schedule", f"schedule:{patient_id}", f"schedule:{patient_id}", load)
+
+async def upload_to_storage(bucket: str, path: str, content, content_type: str = None, size: int = None) -> str:
+    # returns the public URL of the stored object; content may be bytes or an async chunk iterator
+    return await get_backend().upload(bucket, path, content, content_type, size)
+
+async def download_from_storage(bucket: str, path: str) -> bytes:
+    return await get_backend().download(bucket, path)
 
 async def get_last_shift_logs_for_patient(patient_id: str) -> list:
     # get the last closed shift
-    shift = supabase.table("shifts")\
-        .select("id")\
-        .eq("status", "closed")\
-        .order("created_at", desc=True)\
-        .limit(1)\
-        .execute()
-
-    if not shift.data:
+    shift = await get_backend().select(
+        "shifts",
+        columns="id",
+        eq={"status": "closed"},
+        order="created_at", desc=True,
+        limit=1
+    )
+
+    if not shift:
         return []
 
-    shift_id = shift.data[0]["id"]
+    shift_id = shift[0]["id"]
 
     # get all logs for that patient in that shift
-    logs = supabase.table("logs")\
-        .select("*")\
-        .eq("patient_id", patient_id)\
-        .eq("shift_id", shift_id)\
-        .order("created_at", desc=False)\
-        .execute()
-
-    return logs.data
\ No newline at end of file
+    return await get_backend().select(
+        "logs",
+        eq={"patient_id": patient_id, "shift_id": shift_id},
+        order="created_at", desc=False
+    )
+
+async def get_shift_summary(shift_id: str):
+    result = await get_backend().select("shift_summaries", eq={"shift_id": shift_id}, limit=1)
+    return result[0] if result else None
+
+async def save_shift_summary(shift_id: str, summary: dict, folded_log_ids: list):
+    values = {
+        "summary": summary["summary"],
+        "pending_tasks": summary["pending_tasks"],
+        "high_priority": summary["high_priority"],
+        "folded_log_ids": folded_log_ids
+    }
+    # upsert: one rolling summary row per shift
+    updated = await get_backend().update("shift_summaries", values, eq={"shift_id": shift_id})
+    if updated:
+        return updated[0]
+    result = await get_backend().insert("shift_summaries", {"shift_id": shift_id, **values})
+    return result[0]
+
+async def delete_shift_summary(shift_id: str):
+    await get_backend().delete("shift_summaries", eq={"shift_id": shift_id})
+
+# every public query helper reports as stage "db.<name>"; wrapped here so new helpers are covered too
+for _name, _fn in list(globals().items()):
+    if inspect.iscoroutinefunction(_fn) and not _name.startswith("_") and _name not in _CACHED_READERS:
+        globals()[_name] = timed(f"db.{_name}", DB_BACKEND)(_fn)
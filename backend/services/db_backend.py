@@ -0,0 +1,248 @@
+import copy
+import os
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_BACKEND = os.getenv("DB_BACKEND", "supabase").strip().lower()
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_KEEPALIVE = int(os.getenv("DB_MAX_KEEPALIVE", str(DB_POOL_SIZE)))
+DB_KEEPALIVE_EXPIRY = float(os.getenv("DB_KEEPALIVE_EXPIRY", "30"))
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "10"))
+DB_CONNECT_TIMEOUT = float(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+
+
+class SupabaseBackend:
+    """Talks to Supabase PostgREST + Storage over one pooled keep-alive httpx client."""
+
+    def __init__(self, url: str, key: str):
+        if not url or not key:
+            raise ValueError("SUPABASE_URL and SUPABASE_KEY must be configured.")
+        self.url = url.rstrip("/")
+        self.client = httpx.AsyncClient(
+            headers={"apikey": key, "Authorization": f"Bearer {key}"},
+            limits=httpx.Limits(
+                max_connections=DB_POOL_SIZE,
+                max_keepalive_connections=DB_MAX_KEEPALIVE,
+                keepalive_expiry=DB_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(DB_TIMEOUT, connect=DB_CONNECT_TIMEOUT),
+        )
+
+    def _rest(self, table: str) -> str:
+        return f"{self.url}/rest/v1/{table}"
+
+    @staticmethod
+    def _eq_params(eq: dict | None) -> dict:
+        return {col: f"eq.{val}" for col, val in (eq or {}).items()}
+
+    @staticmethod
+    def _quote(value) -> str:
+        # PostgREST double-quoted value; backslash escapes keep quotes and commas inside it
+        return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+    @classmethod
+    def _keyset_filter(cls, columns: list, cursor: list, desc: bool) -> str:
+        # (c1, c2) past (v1, v2)  ==  c1 op v1  OR  (c1 = v1 AND c2 op v2)
+        op = "lt" if desc else "gt"
+        branches = []
+        for i, col in enumerate(columns):
+            terms = [f"{c}.eq.{cls._quote(v)}" for c, v in zip(columns[:i], cursor[:i])]
+            terms.append(f"{col}.{op}.{cls._quote(cursor[i])}")
+            branches.append(terms[0] if len(terms) == 1 else f"and({','.join(terms)})")
+        return f"({','.join(branches)})"
+
+    async def select(
+        self,
+        table: str,
+        columns: str = "*",
+        eq: dict | None = None,
+        order: str | list | None = None,
+        desc: bool = False,
+        limit: int | None = None,
+        cursor: list | None = None,
+    ) -> list:
+        params = {"select": columns, **self._eq_params(eq)}
+        order_cols = [order] if isinstance(order, str) else list(order or [])
+        if order_cols:
+            direction = "desc" if desc else "asc"
+            params["order"] = ",".join(f"{col}.{direction}" for col in order_cols)
+        if cursor:
+            params["or"] = self._keyset_filter(order_cols, cursor, desc)
+        if limit is not None:
+            params["limit"] = str(limit)
+        response = await self.client.get(self._rest(table), params=params)
+        response.raise_for_status()
+        return response.json()
+
+    async def count(self, table: str, eq: dict | None = None) -> int:
+        response = await self.client.head(
+            self._rest(table),
+            params={"select": "id", **self._eq_params(eq)},
+            headers={"Prefer": "count=exact"},
+        )
+        response.raise_for_status()
+        # Content-Range: 0-24/3573
+        return int(response.headers.get("content-range", "*/0").split("/")[-1])
+
+    async def insert(self, table: str, rows: dict | list) -> list:
+        response = await self.client.post(
+            self._rest(table),
+            json=rows,
+            headers={"Prefer": "return=representation"},
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def update(self, table: str, values: dict, eq: dict) -> list:
+        response = await self.client.patch(
+            self._rest(table),
+            params=self._eq_params(eq),
+            json=values,
+            headers={"Prefer": "return=representation"},
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def delete(self, table: str, eq: dict) -> None:
+        response = await self.client.delete(self._rest(table), params=self._eq_params(eq))
+        response.raise_for_status()
+
+    async def upload(self, bucket: str, path: str, content, content_type: str | None, size: int = None) -> str:
+        # content may be bytes or an async iterator of chunks, streamed as it is read;
+        # upsert so re-sending a content-addressed object after a failed request is not a 409
+        headers = {"content-type": content_type or "application/octet-stream", "x-upsert": "true"}
+        if size is not None:
+            headers["content-length"] = str(size)
+        response = await self.client.post(
+            f"{self.url}/storage/v1/object/{bucket}/{path}",
+            content=content,
+            headers=headers,
+        )
+        response.raise_for_status()
+        return self.public_url(bucket, path)
+
+    async def download(self, bucket: str, path: str) -> bytes:
+        response = await self.client.get(f"{self.url}/storage/v1/object/{bucket}/{path}")
+        response.raise_for_status()
+        return response.content
+
+    def public_url(self, bucket: str, path: str) -> str:
+        return f"{self.url}/storage/v1/object/public/{bucket}/{path}"
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class MemoryBackend:
+    """Offline stand-in with the same interface, for local dev and tests."""
+
+    def __init__(self):
+        self.tables: dict[str, list] = {}
+        self.objects: dict[tuple, tuple] = {}
+
+    @staticmethod
+    def _project(row: dict, columns: str) -> dict:
+        if columns.strip() == "*":
+            return copy.deepcopy(row)
+        wanted = [c.strip() for c in columns.split(",") if c.strip()]
+        return {c: copy.deepcopy(row.get(c)) for c in wanted}
+
+    @staticmethod
+    def _matches(row: dict, eq: dict | None) -> bool:
+        return all(str(row.get(col)) == str(val) for col, val in (eq or {}).items())
+
+    async def select(
+        self,
+        table: str,
+        columns: str = "*",
+        eq: dict | None = None,
+        order: str | list | None = None,
+        desc: bool = False,
+        limit: int | None = None,
+        cursor: list | None = None,
+    ) -> list:
+        rows = [r for r in self.tables.get(table, []) if self._matches(r, eq)]
+        order_cols = [order] if isinstance(order, str) else list(order or [])
+        if order_cols:
+            sort_key = lambda r: tuple(str(r.get(col) or "") for col in order_cols)
+            rows.sort(key=sort_key, reverse=desc)
+            if cursor:
+                after = tuple(str(v) for v in cursor)
+                rows = [r for r in rows if (sort_key(r) < after if desc else sort_key(r) > after)]
+        if limit is not None:
+            rows = rows[:limit]
+        return [self._project(r, columns) for r in rows]
+
+    async def count(self, table: str, eq: dict | None = None) -> int:
+        return sum(1 for r in self.tables.get(table, []) if self._matches(r, eq))
+
+    async def insert(self, table: str, rows: dict | list) -> list:
+        rows = rows if isinstance(rows, list) else [rows]
+        stored = []
+        for row in rows:
+            row = copy.deepcopy(row)
+            row.setdefault("id", str(uuid.uuid4()))
+            row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+            self.tables.setdefault(table, []).append(row)
+            stored.append(copy.deepcopy(row))
+        return stored
+
+    async def update(self, table: str, values: dict, eq: dict) -> list:
+        updated = []
+        for row in self.tables.get(table, []):
+            if self._matches(row, eq):
+                row.update(copy.deepcopy(values))
+                updated.append(copy.deepcopy(row))
+        return updated
+
+    async def delete(self, table: str, eq: dict) -> None:
+        self.tables[table] = [
+            row for row in self.tables.get(table, [])
+            if not self._matches(row, eq)
+        ]
+
+    async def upload(self, bucket: str, path: str, content, content_type: str | None, size: int = None) -> str:
+        if not isinstance(content, bytes):
+            content = b"".join([chunk async for chunk in content])
+        # overwrites an existing path, as SupabaseBackend's x-upsert upload does
+        self.objects[(bucket, path)] = (content, content_type)
+        return self.public_url(bucket, path)
+
+    async def download(self, bucket: str, path: str) -> bytes:
+        return self.objects[(bucket, path)][0]
+
+    def public_url(self, bucket: str, path: str) -> str:
+        return f"memory://{bucket}/{path}"
+
+    async def aclose(self):
+        pass
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if DB_BACKEND == "memory":
+            _backend = MemoryBackend()
+        else:
+            _backend = SupabaseBackend(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+    return _backend
+
+
+def set_backend(backend):
+    global _backend
+    _backend = backend
+
+
+async def close_backend():
+    global _backend
+    if _backend is not None:
+        await _backend.aclose()
+        _backend = None
@@ -0,0 +1,252 @@
+import os
+import re
+
+# routine notes parsed here with at least this confidence skip the extraction LLM call
+FAST_EXTRACT_ENABLED = os.getenv("FAST_EXTRACT_ENABLED", "1") == "1"
+FAST_EXTRACT_MIN_CONFIDENCE = float(os.getenv("FAST_EXTRACT_MIN_CONFIDENCE", "0.85"))
+
+# canonical name -> spellings and brand names nurses (and Whisper) actually produce
+MEDICATIONS = {
+    "paracetamol": ["paracetamol", "paracetmol", "para cetamol", "pcm", "acetaminophen", "crocin", "dolo", "calpol"],
+    "ibuprofen": ["ibuprofen", "ibuprofin", "brufen", "combiflam"],
+    "diclofenac": ["diclofenac", "voveran"],
+    "tramadol": ["tramadol"],
+    "morphine": ["morphine"],
+    "amoxicillin": ["amoxicillin", "amoxycillin", "amoxicilin", "amox", "augmentin"],
+    "azithromycin": ["azithromycin", "azithral", "azee"],
+    "ceftriaxone": ["ceftriaxone", "ceftriaxon", "monocef"],
+    "metronidazole": ["metronidazole", "metrogyl", "flagyl"],
+    "pantoprazole": ["pantoprazole", "pantop", "pan 40", "pan d"],
+    "omeprazole": ["omeprazole", "omez"],
+    "ondansetron": ["ondansetron", "ondem", "zofran", "emeset"],
+    "metformin": ["metformin", "glycomet"],
+    "insulin": ["insulin", "actrapid", "mixtard", "lantus", "glargine"],
+    "aspirin": ["aspirin", "ecosprin", "disprin"],
+    "atorvastatin": ["atorvastatin", "atorva"],
+    "amlodipine": ["amlodipine", "amlong"],
+    "metoprolol": ["metoprolol", "metolar"],
+    "furosemide": ["furosemide", "frusemide", "lasix"],
+    "heparin": ["heparin"],
+    "enoxaparin": ["enoxaparin", "clexane"],
+    "salbutamol": ["salbutamol", "asthalin", "albuterol"],
+    "dexamethasone": ["dexamethasone", "dexona"],
+    "hydrocortisone": ["hydrocortisone"],
+    "cetirizine": ["cetirizine", "cetrizine"],
+    "normal saline": ["normal saline", "ns"],
+    "ringer lactate": ["ringer lactate", "ringers lactate", "rl"],
+    "dextrose": ["dextrose", "dns"],
+}
+
+_ALIASES = {alias: name for name, aliases in MEDICATIONS.items() for alias in aliases}
+
+
+def canonical_medication(name: str | None) -> str | None:
+    """Generic name for a drug or brand name in the lexicon, else the name lowercased."""
+    if not name:
+        return None
+    text = _normalize(name)
+    match = _MEDICATION_RE.search(text)
+    return _ALIASES[match.group(1)] if match else text
+
+
+_MEDICATION_RE = re.compile(
+    r"\b(" + "|".join(re.escape(a) for a in sorted(_ALIASES, key=len, reverse=True)) + r")\b"
+)
+
+_UNITS = {
+    "mg": "mg", "milligram": "mg", "milligrams": "mg",
+    "mcg": "mcg", "microgram": "mcg", "micrograms": "mcg",
+    "g": "g", "gm": "g", "gram": "g", "grams": "g",
+    "ml": "ml", "millilitre": "ml", "millilitres": "ml", "milliliter": "ml", "milliliters": "ml",
+    "unit": "units", "units": "units", "iu": "units",
+    "tab": "tablet", "tabs": "tablet", "tablet": "tablet", "tablets": "tablet",
+    "puff": "puffs", "puffs": "puffs",
+}
+_DOSE_RE = re.compile(r"\b(\d+(?:\.\d+)?)\s*(" + "|".join(sorted(_UNITS, key=len, reverse=True)) + r")\b")
+
+_TIME_RES = [
+    re.compile(r"\b(\d{1,2})[:.](\d{2})\s*(am|pm|a\.m\.|p\.m\.|hrs|hours)?(?![\d/])"),
+    re.compile(r"\b(\d{1,2})\s*(am|pm|a\.m\.|p\.m\.|o'?clock)(?!\w)"),
+    re.compile(r"\bat\s+(\d{1,2})\b(?![:./]|\s*(?:" + "|".join(_UNITS) + r")\b)"),
+]
+
+_VITALS_RES = {
+    "bp": re.compile(r"\b(?:bp|blood pressure)\s*(?:is|was|of|:)?\s*(\d{2,3})\s*(?:/|over|by)\s*(\d{2,3})\b"),
+    "pulse": re.compile(r"\b(?:pulse|pulse rate|hr|heart rate)\s*(?:is|was|of|:)?\s*(\d{2,3})\b"),
+    "temp": re.compile(r"\b(?:temp|temperature)\s*(?:is|was|of|:)?\s*(\d{2,3}(?:\.\d)?)\b"),
+    "spo2": re.compile(r"\b(?:spo2|sp o2|sats|saturation|oxygen saturation)\s*(?:is|was|of|:)?\s*(\d{2,3})\b"),
+    "rr": re.compile(r"\b(?:rr|resp rate|respiratory rate)\s*(?:is|was|of|:)?\s*(\d{1,2})\b"),
+    "sugar": re.compile(r"\b(?:sugar|blood sugar|glucose|grbs|rbs|cbg)\s*(?:is|was|of|:)?\s*(\d{2,3})\b"),
+}
+
+_PATIENT_RE = re.compile(r"\b(?:patient|mr|mrs|ms|miss)\.?\s+([a-z]{3,})\b")
+_NOT_NAMES = {
+    "was", "has", "had", "the", "is", "in", "on", "at", "and", "for", "with", "also", "still", "now",
+    "complains", "complaining", "refused", "given", "received", "took", "ate", "slept", "vomited",
+    "denies", "reports", "says", "feels",
+}
+
+_GIVEN_WORDS = re.compile(r"\b(gave|given|give|administered|administer|started|pushed|injected|took|taken|applied)\b")
+_DRESSING_WORDS = re.compile(r"\b(dressing|wound|bandage|sutures?|stitches|drain site|cannula site)\b")
+_OBSERVATION_WORDS = re.compile(
+    r"\b(complain\w*|pain|vomit\w*|nause\w*|drowsy|confused|restless|anxious|sleeping|slept|ate|eating|walked|ambulat\w*|cough\w*)\b"
+)
+# nuance the rules cannot judge reliably: leave these to the LLM
+_UNCERTAIN_WORDS = re.compile(
+    r"\b(not|refused|withheld|held|missed|skipped|didn'?t|couldn'?t|unable|maybe|might|possibly|unclear|doctor said|informed)\b"
+)
+_INDICATION_RE = re.compile(r"\bfor (?:\w+ )?(?:pain|fever|nausea|vomiting|cough)\b")
+_RED_FLAGS = re.compile(
+    r"\b(urgent|stat|emergency|critical|immediately|chest pain|breathless|short of breath|unresponsive|"
+    r"fell|fall|bleeding|seizure|allergic|reaction|rash|collapsed)\b"
+)
+
+ROUTINE_PRIORITY = {"medication": "medium", "vitals": "low", "dressing": "low", "observation": "low", "note": "low"}
+MAX_ROUTINE_WORDS = int(os.getenv("FAST_EXTRACT_MAX_WORDS", "30"))
+
+
+def _normalize(transcript: str) -> str:
+    return re.sub(r"\s+", " ", transcript.lower().replace(",", " ")).strip()
+
+
+def _time_mentioned(text: str):
+    for pattern in _TIME_RES:
+        match = pattern.search(text)
+        if not match:
+            continue
+        parts = [p for p in match.groups() if p]
+        if len(parts) >= 2 and parts[1].isdigit():
+            clock = f"{parts[0]}:{parts[1]}"
+            suffix = parts[2:] if len(parts) > 2 else []
+        else:
+            clock, suffix = parts[0], parts[1:]
+        suffix = [s.replace(".", "") for s in suffix if s not in ("hrs", "hours") and "clock" not in s]
+        return " ".join([clock] + suffix)
+    return None
+
+
+def _vitals(text: str) -> dict:
+    readings = {}
+    for name, pattern in _VITALS_RES.items():
+        match = pattern.search(text)
+        if match:
+            readings[name] = [float(g) for g in match.groups()]
+    return readings
+
+
+def _vitals_priority(readings: dict) -> str:
+    def reading(name, i=0):
+        return readings[name][i] if name in readings else None
+
+    systolic, diastolic = reading("bp"), reading("bp", 1)
+    pulse, spo2, rr, sugar = reading("pulse"), reading("spo2"), reading("rr"), reading("sugar")
+    temp = reading("temp")
+    if temp is not None and temp > 50:
+        temp = (temp - 32) * 5 / 9  # fahrenheit
+
+    def out_of(value, low, high):
+        return value is not None and (value < low or value > high)
+
+    if (out_of(systolic, 90, 179) or out_of(diastolic, 0, 109) or out_of(pulse, 50, 120)
+            or out_of(spo2, 90, 100) or out_of(rr, 8, 28) or out_of(sugar, 70, 300)
+            or out_of(temp, 35, 38.9)):
+        return "high"
+    if (out_of(systolic, 0, 139) or out_of(diastolic, 0, 89) or out_of(pulse, 0, 100)
+            or out_of(spo2, 94, 100) or out_of(sugar, 0, 200) or out_of(temp, 0, 37.9)):
+        return "medium"
+    return "low"
+
+
+def _format_vitals(readings: dict) -> str:
+    labels = {"bp": "BP", "pulse": "pulse", "temp": "temp", "spo2": "SpO2", "rr": "RR", "sugar": "sugar"}
+    parts = []
+    for name, values in readings.items():
+        shown = "/".join(f"{v:g}" for v in values)
+        parts.append(f"{labels[name]} {shown}")
+    return ", ".join(parts)
+
+
+def fast_extract_log(transcript: str, prescription: str = "none") -> dict:
+    """Rule/lexicon extraction in the extract_log shape, with a confidence in [0, 1].
+
+    Callers should only trust results at or above FAST_EXTRACT_MIN_CONFIDENCE.
+    """
+    text = _normalize(transcript)
+    medications = {_ALIASES[m] for m in _MEDICATION_RE.findall(text)}
+    doses = _DOSE_RE.findall(text)
+    readings = _vitals(text)
+    dressing = bool(_DRESSING_WORDS.search(text))
+    # "for pain" / "for fever" names the indication, not a separate observation
+    observation = bool(_OBSERVATION_WORDS.search(_INDICATION_RE.sub("", text)))
+
+    categories = [
+        name for name, hit in (
+            ("medication", bool(medications)),
+            ("vitals", bool(readings)),
+            ("dressing", dressing),
+            ("observation", observation),
+        ) if hit
+    ]
+    action_type = categories[0] if categories else "note"
+
+    medication = dose = None
+    if action_type == "medication":
+        medication = next(iter(medications)) if len(medications) == 1 else None
+        if doses:
+            amount, unit = doses[0]
+            dose = f"{amount} {_UNITS[unit]}"
+
+    patient = _PATIENT_RE.search(text)
+    patient_name = patient.group(1).capitalize() if patient and patient.group(1) not in _NOT_NAMES else None
+
+    if action_type == "vitals":
+        priority = _vitals_priority(readings)
+    else:
+        priority = ROUTINE_PRIORITY[action_type]
+    if _RED_FLAGS.search(text):
+        priority = "high"
+
+    # confidence: one unambiguous routine category parsed completely
+    if action_type == "medication":
+        confidence = 0.95 if medication and dose and _GIVEN_WORDS.search(text) else 0.6
+    elif action_type == "vitals":
+        confidence = 0.95
+    elif action_type == "dressing":
+        confidence = 0.9
+    elif action_type == "observation":
+        confidence = 0.6  # free-form by nature
+    else:
+        confidence = 0.2
+    if len(categories) > 1:
+        confidence = min(confidence, 0.5)
+    if len(doses) > 1 and action_type == "medication":
+        confidence = min(confidence, 0.6)
+    if _UNCERTAIN_WORDS.search(text) or _RED_FLAGS.search(text):
+        confidence = min(confidence, 0.6)
+    if len(text.split()) > MAX_ROUTINE_WORDS:
+        confidence *= 0.8
+
+    # word-bounded, so short aliases ("ns", "rl") don't match inside other drug names
+    prescribed = {_ALIASES[m] for m in _MEDICATION_RE.findall(_normalize(prescription or ""))}
+    matched = bool(medication) and medication in prescribed
+
+    return {
+        "patient_name": patient_name,
+        "action_type": action_type,
+        "medication": medication,
+        "dose": dose,
+        "time_mentioned": _time_mentioned(text),
+        "notes": _format_vitals(readings) if action_type == "vitals" else transcript.strip(),
+        "priority": priority,
+        "matched_prescription": matched,
+        "confidence": round(confidence, 2),
+        "extracted_by": "rules",
+    }
+
+
+def try_fast_extract(transcript: str, prescription: str = "none"):
+    """The rule-based extraction if enabled and confident enough, else None."""
+    if not FAST_EXTRACT_ENABLED:
+        return None
+    structured = fast_extract_log(transcript, prescription)
+    return structured if structured["confidence"] >= FAST_EXTRACT_MIN_CONFIDENCE else None
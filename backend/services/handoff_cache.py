@@ -0,0 +1,36 @@
+import hashlib
+import json
+import os
+
+from services.cache import TTLCache, DBStore
+
+HANDOFF_CACHE_SIZE = int(os.getenv("HANDOFF_CACHE_SIZE", "512"))
+HANDOFF_CACHE_TTL = float(os.getenv("HANDOFF_CACHE_TTL", "86400"))
+# "db" also persists summaries in the handoff_summary_cache table so they survive restarts
+HANDOFF_CACHE_STORE = os.getenv("HANDOFF_CACHE_STORE", "memory").strip().lower()
+
+summary_cache = TTLCache(
+    maxsize=HANDOFF_CACHE_SIZE,
+    ttl=HANDOFF_CACHE_TTL,
+    store=DBStore("handoff_summary_cache") if HANDOFF_CACHE_STORE == "db" else None,
+)
+
+
+def summary_key(patient_id: str, logs: list) -> str:
+    # (shift, patient, log ids and contents) pins the summary; an edit keeps the id but
+    # changes the contents, so every process misses on the new key without being told
+    shift_id = logs[0].get("shift_id") if logs else None
+    content = json.dumps(
+        sorted(
+            [str(log["id"]), log.get("raw_text"), log.get("structured_log"), log.get("needs_review")]
+            for log in logs
+        ),
+        sort_keys=True, default=str, separators=(",", ":"),
+    )
+    digest = hashlib.sha256(content.encode()).hexdigest()[:16]
+    return f"{shift_id}:{patient_id}:{digest}"
+
+
+async def invalidate_patient(patient_id: str):
+    # frees this process's (and the db store's) now-unreachable entries after an edit
+    await summary_cache.invalidate(patient_id)
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import os
+import time
+from collections import Counter, defaultdict
+
+from services.llm_gateway import generate_handoff, merge_handoffs
+from services.prescription_index import ward_time
+
+# below these sizes a single compact prompt is cheaper than map + reduce
+MAP_REDUCE_MIN_LOGS = int(os.getenv("HANDOFF_MAP_REDUCE_MIN_LOGS", "20"))
+MAP_REDUCE_MIN_PATIENTS = int(os.getenv("HANDOFF_MAP_REDUCE_MIN_PATIENTS", "2"))
+
+# the only log columns encode_logs reads
+HANDOFF_LOG_COLUMNS = "id,patient_id,created_at,raw_text,structured_log,needs_review"
+
+
+def approx_tokens(text: str) -> int:
+    # ~4 chars per token is close enough to compare encodings
+    return max(1, len(text) // 4)
+
+
+def _patient_label(patient_id: str, logs: list) -> str:
+    # the extracted name is only a label; the id keeps same-named patients apart
+    names = Counter(
+        (log.get("structured_log") or {}).get("patient_name") or "" for log in logs
+    )
+    names.pop("", None)
+    if not names:
+        return patient_id
+    return f"{names.most_common(1)[0][0]} ({patient_id})"
+
+
+def _encode_log(log: dict) -> str:
+    structured = log.get("structured_log") or {}
+    at = ward_time(log)
+    fields = [
+        at.strftime("%H:%M") if at else "--:--",
+        structured.get("action_type") or "note",
+        " ".join(v for v in (structured.get("medication"), structured.get("dose")) if v),
+        structured.get("time_mentioned") or "",
+        structured.get("priority") or "",
+        structured.get("notes") or log.get("raw_text") or "",
+    ]
+    line = " | ".join(str(f) for f in fields)
+    return line + " [NEEDS REVIEW]" if log.get("needs_review") else line
+
+
+def group_by_patient(logs: list) -> dict:
+    # keyed by patient_id, never by the LLM-extracted name, which varies in spelling and collides
+    groups = defaultdict(list)
+    for log in logs:
+        groups[str(log.get("patient_id") or "unknown")].append(log)
+    return groups
+
+
+def encode_logs(logs: list) -> str:
+    """Project only what a handoff needs into compact per-patient lines."""
+    blocks = []
+    for patient_id, patient_logs in group_by_patient(logs).items():
+        blocks.append(f"## {_patient_label(patient_id, patient_logs)}\n" + "\n".join(_encode_log(log) for log in patient_logs))
+    return "\n".join(blocks)
+
+
+async def summarize_logs(logs: list) -> tuple[dict, dict]:
+    """Returns (handoff summary, report) using one call or map-reduce depending on shift size."""
+    start = time.perf_counter()
+    groups = group_by_patient(logs)
+    report = {
+        "logs": len(logs),
+        "patients": len(groups),
+        "legacy_prompt_tokens": approx_tokens(json.dumps(logs, indent=2, default=str)),
+    }
+
+    if len(logs) < MAP_REDUCE_MIN_LOGS or len(groups) < MAP_REDUCE_MIN_PATIENTS:
+        encoded = encode_logs(logs)
+        summary = await generate_handoff(encoded)
+        report.update(strategy="single", prompt_tokens=approx_tokens(encoded))
+    else:
+        # map: one summary per patient, concurrently (bounded by the provider limiters)
+        encoded_groups = [encode_logs(patient_logs) for patient_logs in groups.values()]
+        map_start = time.perf_counter()
+        partials = await asyncio.gather(*(generate_handoff(text) for text in encoded_groups))
+        report["map_ms"] = round((time.perf_counter() - map_start) * 1000, 1)
+
+        # reduce: merge the per-patient summaries
+        reduce_start = time.perf_counter()
+        summary = await merge_handoffs(list(partials))
+        report["reduce_ms"] = round((time.perf_counter() - reduce_start) * 1000, 1)
+        report.update(
+            strategy="map_reduce",
+            prompt_tokens=sum(approx_tokens(t) for t in encoded_groups)
+            + approx_tokens(json.dumps(list(partials), separators=(",", ":"))),
+            largest_prompt_tokens=max(approx_tokens(t) for t in encoded_groups),
+        )
+
+    report["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return summary, report
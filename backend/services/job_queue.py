@@ -0,0 +1,229 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "data/jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# a running job whose lease lapses (worker died, server restarted) is picked up again;
+# the worker running it renews the lease every third of this while the handler is busy
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+# a failed attempt is requeued after this, doubling with each further attempt
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "10"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+# how long a worker waits after the queue database itself errors (e.g. "database is locked")
+JOB_ERROR_BACKOFF = float(os.getenv("JOB_ERROR_BACKOFF", "5"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    blob BLOB,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    leased_until REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+# failures another attempt cannot fix: a malformed payload, no handler for the
+# kind, an empty recording, output that does not parse
+NON_RETRYABLE = (ValueError, LookupError, TypeError)
+
+
+class LeaseLost(Exception):
+    """The job's lease lapsed and another worker reclaimed it."""
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(JOB_DB_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(JOB_DB_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _enqueue(kind: str, payload: dict, blob: bytes) -> str:
+    job_id = str(uuid.uuid4())
+    now = time.time()
+    with closing(_connect()) as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, kind, status, payload, blob, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(payload), blob, now, now),
+        )
+    return job_id
+
+
+def _claim() -> sqlite3.Row | None:
+    now = time.time()
+    conn = _connect()
+    try:
+        # IMMEDIATE takes the write lock up front so two workers never claim the same job
+        conn.execute("BEGIN IMMEDIATE")
+        # a lapsed job that already used every attempt (e.g. it keeps crashing the process) is given up on
+        conn.execute(
+            """UPDATE jobs SET status = 'failed', error = 'lease expired on final attempt', blob = NULL,
+               leased_until = NULL, updated_at = ?
+               WHERE status = 'running' AND leased_until < ? AND attempts >= ?""",
+            (now, now, JOB_MAX_ATTEMPTS),
+        )
+        # a requeued job keeps its retry time in leased_until until it is due
+        row = conn.execute(
+            """SELECT * FROM jobs
+               WHERE (status = 'queued' AND (leased_until IS NULL OR leased_until <= ?))
+                  OR (status = 'running' AND leased_until < ? AND attempts < ?)
+               ORDER BY created_at LIMIT 1""",
+            (now, now, JOB_MAX_ATTEMPTS),
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, leased_until = ?, updated_at = ? WHERE id = ?",
+                (now + JOB_LEASE_SECONDS, now, row["id"]),
+            )
+        conn.execute("COMMIT")
+        return row
+    except Exception:
+        # BEGIN itself may have failed, and a second error here would hide the first
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def _extend_lease(job_id: str, attempt: int) -> bool:
+    with closing(_connect()) as conn:
+        cursor = conn.execute(
+            "UPDATE jobs SET leased_until = ? WHERE id = ? AND attempts = ? AND status = 'running'",
+            (time.time() + JOB_LEASE_SECONDS, job_id, attempt),
+        )
+    return cursor.rowcount == 1
+
+
+def _finish(job_id: str, attempt: int, result: dict = None, error: str = None, retry: bool = False):
+    # fenced on the attempt, so a worker that lost its lease cannot overwrite the one that took over
+    status = "queued" if retry else ("failed" if error else "done")
+    now = time.time()
+    retry_at = now + JOB_RETRY_BACKOFF * 2 ** (attempt - 1) if retry else None
+    with closing(_connect()) as conn:
+        conn.execute(
+            """UPDATE jobs SET status = ?, result = ?, error = ?, leased_until = ?, updated_at = ?,
+               blob = CASE WHEN ? IN ('done', 'failed') THEN NULL ELSE blob END
+               WHERE id = ? AND attempts = ? AND status = 'running'""",
+            (status, json.dumps(result, default=str) if result is not None else None, error, retry_at, now,
+             status, job_id, attempt),
+        )
+
+
+def _get(job_id: str) -> dict | None:
+    with closing(_connect()) as conn:
+        row = conn.execute(
+            "SELECT id, kind, status, result, error, attempts, created_at, updated_at FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+    if row is None:
+        return None
+    job = dict(row)
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+_wakeup: asyncio.Event = None
+_workers: list = []
+
+
+async def enqueue(kind: str, payload: dict, blob: bytes = None) -> str:
+    job_id = await asyncio.to_thread(_enqueue, kind, payload, blob)
+    if _wakeup is not None:
+        _wakeup.set()
+    return job_id
+
+
+async def get_job(job_id: str) -> dict | None:
+    return await asyncio.to_thread(_get, job_id)
+
+
+async def _worker(handlers: dict):
+    while True:
+        try:
+            await _run_next(handlers)
+        except Exception as e:
+            # queue database trouble: keep the worker alive and try again shortly
+            print(f"❌ Job worker error, retrying in {JOB_ERROR_BACKOFF:g} s: {e!r}")
+            await asyncio.sleep(JOB_ERROR_BACKOFF)
+
+
+async def _run_next(handlers: dict):
+    job = await asyncio.to_thread(_claim)
+    if job is None:
+        _wakeup.clear()
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=JOB_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        return
+
+    attempt = job["attempts"] + 1  # the row was read before the claim counted this attempt
+    try:
+        handler = handlers.get(job["kind"])
+        if handler is None:
+            raise LookupError(f"no handler for job kind {job['kind']!r}")
+        work = handler(json.loads(job["payload"]), job["blob"])
+        result = await _run_leased(job["id"], attempt, work)
+        await asyncio.to_thread(_finish, job["id"], attempt, result)
+    except LeaseLost as e:
+        print(f"⚠️ Job {job['id']} abandoned: {e}")
+    except Exception as e:
+        retry = attempt < JOB_MAX_ATTEMPTS and not isinstance(e, NON_RETRYABLE)
+        await asyncio.to_thread(_finish, job["id"], attempt, None, str(e), retry)
+
+
+async def _run_leased(job_id: str, attempt: int, work) -> dict:
+    # runs the handler, renewing the lease while it is busy; stops it once the lease is lost
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=JOB_LEASE_SECONDS / 3)
+            if done:
+                return task.result()
+            try:
+                renewed = await asyncio.to_thread(_extend_lease, job_id, attempt)
+            except sqlite3.Error as e:
+                print(f"⚠️ Job lease renewal failed: {e!r}")
+                continue
+            if not renewed:
+                raise LeaseLost(f"lease on attempt {attempt} lapsed and the job was reclaimed")
+    finally:
+        task.cancel()
+
+
+def start_workers(handlers: dict):
+    """Start JOB_WORKERS background workers.
+
+    Queued jobs left by a previous run are picked up immediately, jobs that were
+    mid-flight once their lease lapses.
+    """
+    global _wakeup
+    _wakeup = asyncio.Event()
+    for _ in range(JOB_WORKERS):
+        _workers.append(asyncio.create_task(_worker(handlers)))
+
+
+async def stop_workers():
+    for task in _workers:
+        task.cancel()
+    _workers.clear()
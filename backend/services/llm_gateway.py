@@ -0,0 +1,386 @@
+"""Every LLM call in the app goes through here.
+
+Gemini and MegaLLM sit behind one interface, complete(messages) -> str, and
+each task has an ordered provider route. Per-provider health feeds a circuit
+breaker, failed calls fall over down the route, and with LLM_HEDGE the
+latency-critical tasks also start the next provider when the first overruns.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import deque
+
+from services import gemini, mega_llm, metrics, prompts
+from services.result_cache import extract_cache, extract_key
+
+PROVIDERS = {"gemini": gemini.complete, "megallm": mega_llm.complete}
+STREAMS = {"megallm": mega_llm.stream}
+# providers that accept media parts (prescription images and PDFs)
+MULTIMODAL = {"gemini"}
+
+# provider order per task; override one with e.g. LLM_ROUTE_CLEAN=gemini,megallm
+DEFAULT_ROUTES = {
+    "clean": "megallm,gemini",
+    "extract": "gemini,megallm",
+    "clean_extract": "gemini,megallm",
+    "prescription_parse": "gemini,megallm",
+    "handoff": "gemini,megallm",
+    "handoff_merge": "gemini,megallm",
+    "handoff_update": "gemini,megallm",
+    "chat": "megallm,gemini",
+    "chat_summary": "megallm,gemini",
+}
+ROUTES = {
+    task: [p.strip() for p in os.getenv(f"LLM_ROUTE_{task.upper()}", default).split(",") if p.strip() in PROVIDERS]
+    for task, default in DEFAULT_ROUTES.items()
+}
+
+LLM_BREAKER = os.getenv("LLM_BREAKER", "1") == "1"
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "5"))
+LLM_BREAKER_FAILURE_RATE = float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+# a success this much slower than the task's running average still counts as a failure
+LLM_SLOW_FACTOR = float(os.getenv("LLM_SLOW_FACTOR", "3"))
+LLM_SLOW_MIN_MS = float(os.getenv("LLM_SLOW_MIN_MS", "5000"))
+
+# when another provider is left on the route, the gateway owns retries: one attempt with a
+# deadline of this many times the task's running average instead of the limiter's retries
+LLM_ATTEMPT_FACTOR = float(os.getenv("LLM_ATTEMPT_FACTOR", "4"))
+LLM_ATTEMPT_MIN_S = float(os.getenv("LLM_ATTEMPT_MIN_S", "5"))
+# deadline before a provider's latency for the task is known
+LLM_ATTEMPT_TIMEOUT = float(os.getenv("LLM_ATTEMPT_TIMEOUT", "30"))
+
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+LLM_HEDGE_TASKS = {t.strip() for t in os.getenv("LLM_HEDGE_TASKS", "clean,extract,clean_extract,chat").split(",")}
+LLM_HEDGE_FACTOR = float(os.getenv("LLM_HEDGE_FACTOR", "1.5"))
+LLM_HEDGE_MIN_MS = float(os.getenv("LLM_HEDGE_MIN_MS", "1500"))
+
+
+class CircuitOpen(Exception):
+    """The provider (or every provider on a task's route) is being skipped by its breaker."""
+
+
+class ProviderHealth:
+    """Circuit breaker over one provider's recent calls.
+
+    Errors and latency spikes both count as failures. Once they reach
+    LLM_BREAKER_FAILURE_RATE of the window the circuit opens and routes skip
+    the provider; after LLM_BREAKER_COOLDOWN one probe call is let through and
+    its outcome closes or reopens the circuit.
+    """
+
+    STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+    def __init__(self, name: str, alpha: float = 0.2):
+        self.name = name
+        self.alpha = alpha
+        self.outcomes = deque(maxlen=LLM_BREAKER_WINDOW)
+        self.latency_ms = {}  # task -> EWMA of successful calls
+        self.samples = {}
+        self.opened_at = 0.0
+        self.probing = False
+        self.trips = 0
+        self._set_state("closed")
+
+    def _set_state(self, state: str):
+        self.state = state
+        metrics.gauge_set("nursesync_llm_circuit_state", self.STATES[state], provider=self.name)
+
+    def available(self) -> bool:
+        if not LLM_BREAKER or self.state == "closed":
+            return True
+        if self.state == "open":
+            return time.monotonic() - self.opened_at >= LLM_BREAKER_COOLDOWN
+        return not self.probing
+
+    def begin(self) -> bool:
+        """Claim a call; False while open, or half-open with the probe already out."""
+        if not LLM_BREAKER or self.state == "closed":
+            return True
+        if not self.available():
+            return False
+        self._set_state("half_open")
+        self.probing = True
+        return True
+
+    def abandon(self):
+        # a cancelled call (e.g. the losing side of a hedge) says nothing about health
+        self.probing = False
+
+    def estimate(self, task: str) -> float | None:
+        if self.samples.get(task, 0) < LLM_BREAKER_MIN_CALLS:
+            return None
+        return self.latency_ms[task]
+
+    def record(self, task: str, elapsed_ms: float, ok: bool):
+        expected = self.estimate(task)
+        slow = ok and expected is not None and elapsed_ms > max(LLM_SLOW_MIN_MS, expected * LLM_SLOW_FACTOR)
+        if ok:
+            previous = self.latency_ms.get(task, elapsed_ms)
+            self.latency_ms[task] = previous + self.alpha * (elapsed_ms - previous)
+            self.samples[task] = self.samples.get(task, 0) + 1
+        if slow:
+            metrics.inc("nursesync_llm_slow_calls_total", provider=self.name, task=task)
+
+        healthy = ok and not slow
+        if self.state == "half_open":
+            self.probing = False
+            if healthy:
+                print(f"✅ LLM circuit closed for {self.name}")
+                self.outcomes.clear()
+                self._set_state("closed")
+            else:
+                self._trip()
+            return
+        self.outcomes.append(healthy)
+        if (
+            LLM_BREAKER
+            and self.state == "closed"
+            and len(self.outcomes) >= LLM_BREAKER_MIN_CALLS
+            and self.outcomes.count(False) / len(self.outcomes) >= LLM_BREAKER_FAILURE_RATE
+        ):
+            self._trip()
+
+    def _trip(self):
+        print(f"⚡ LLM circuit open for {self.name}, retrying in {LLM_BREAKER_COOLDOWN:g} s")
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        self.outcomes.clear()
+        metrics.inc("nursesync_llm_circuit_trips_total", provider=self.name)
+        self._set_state("open")
+
+    def snapshot(self) -> dict:
+        snap = {
+            "state": self.state,
+            "window_calls": len(self.outcomes),
+            "window_failures": self.outcomes.count(False),
+            "trips": self.trips,
+            "latency_ms": {task: round(ms) for task, ms in self.latency_ms.items()},
+        }
+        if self.state == "open":
+            snap["retry_in_s"] = round(max(0.0, LLM_BREAKER_COOLDOWN - (time.monotonic() - self.opened_at)), 1)
+        return snap
+
+
+provider_health = {name: ProviderHealth(name) for name in PROVIDERS}
+
+
+def _ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
+
+
+def _text(reply: str) -> str:
+    return (reply or "").strip()
+
+
+def _json(reply: str) -> dict:
+    # malformed JSON raises here, inside the attempt, so it falls over like any other error
+    return json.loads(_text(reply).replace("```json", "").replace("```", ""))
+
+
+def _order(task: str, messages: list) -> list:
+    route = ROUTES[task]
+    if prompts.has_media(messages):
+        route = [p for p in route if p in MULTIMODAL]
+    order = [p for p in route if provider_health[p].available()]
+    if not order:
+        raise CircuitOpen(f"no LLM provider available for {task}: {', '.join(route) or 'none'} circuit open")
+    return order
+
+
+def _attempt_deadline(task: str, provider: str, last: bool) -> float | None:
+    """Seconds for a single attempt, or None on the route's last provider (limiter retries apply)."""
+    if last:
+        return None
+    expected = provider_health[provider].estimate(task)
+    if expected is None:
+        return LLM_ATTEMPT_TIMEOUT
+    return max(LLM_ATTEMPT_MIN_S, expected * LLM_ATTEMPT_FACTOR / 1000)
+
+
+async def _call(provider: str, task: str, messages: list, parse, deadline: float = None):
+    health = provider_health[provider]
+    if not health.begin():
+        raise CircuitOpen(f"{provider} circuit open")
+    start = time.perf_counter()
+    try:
+        with metrics.stage(task, provider):
+            result = parse(await PROVIDERS[provider](messages, deadline))
+    except asyncio.CancelledError:
+        health.abandon()
+        raise
+    except Exception:
+        health.record(task, _ms(start), ok=False)
+        raise
+    health.record(task, _ms(start), ok=True)
+    return result
+
+
+def _hedge_deadline(task: str, provider: str) -> float | None:
+    # no hedging until the provider's usual latency for this task is known
+    expected = provider_health[provider].estimate(task)
+    if not LLM_HEDGE or task not in LLM_HEDGE_TASKS or expected is None:
+        return None
+    return max(LLM_HEDGE_MIN_MS, expected * LLM_HEDGE_FACTOR) / 1000
+
+
+async def _first_success(task: str, order: list, call) -> tuple:
+    """Run providers down the route until one succeeds. A hedged task also starts
+    the next provider once the current one overruns. call(provider, last) runs one
+    provider, last saying whether any provider is left after it. Returns (result, provider)."""
+    errors = []
+    remaining = list(order)
+    while remaining:
+        provider = remaining.pop(0)
+        running = {asyncio.create_task(call(provider, not remaining)): provider}
+        deadline = _hedge_deadline(task, provider) if remaining else None
+        done, _ = await asyncio.wait(set(running), timeout=deadline)
+        if not done:
+            backup = remaining.pop(0)
+            metrics.inc("nursesync_llm_hedges_total", task=task, provider=backup)
+            running[asyncio.create_task(call(backup, not remaining))] = backup
+
+        pending = set(running)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        return attempt.result(), running[attempt]
+                    errors.append(attempt.exception())
+        finally:
+            for attempt in pending:
+                attempt.cancel()
+        if remaining:
+            metrics.inc("nursesync_llm_failovers_total", task=task, provider=provider)
+    raise errors[0]
+
+
+async def complete(task: str, messages: list, parse=_text) -> tuple:
+    """(parsed reply, provider that produced it) for one task's messages."""
+    return await _first_success(
+        task, _order(task, messages),
+        lambda p, last: _call(p, task, messages, parse, _attempt_deadline(task, p, last)),
+    )
+
+
+async def clean_transcript(raw_transcript: str) -> str:
+    clean, _ = await complete("clean", prompts.clean_messages(raw_transcript))
+    return clean
+
+
+async def extract_log(transcript: str, prescription: str = "none") -> dict:
+    key = extract_key(transcript, prescription)
+    cached = await extract_cache.get(key)
+    if cached is not None:
+        return dict(cached)
+
+    structured, provider = await complete("extract", prompts.extract_messages(transcript, prescription), _json)
+    structured["extracted_by"] = provider
+    await extract_cache.set(key, structured)
+    return dict(structured)
+
+
+async def clean_and_extract(raw_transcript: str, prescription: str = "none") -> tuple[str, dict]:
+    # one round trip instead of clean_transcript + extract_log
+    structured, provider = await complete(
+        "clean_extract", prompts.clean_and_extract_messages(raw_transcript, prescription), _json,
+    )
+    clean = (structured.pop("clean_transcript", None) or raw_transcript).strip()
+    structured["extracted_by"] = provider
+    return clean, structured
+
+
+async def parse_prescription(content: bytes, mime_type: str) -> list:
+    # one call at upload time; the parsed schedule is indexed instead of re-sent per log
+    parsed, _ = await complete("prescription_parse", prompts.prescription_messages(content, mime_type), _json)
+    return parsed.get("medications") or []
+
+
+async def generate_handoff(logs_text: str) -> dict:
+    handoff, _ = await complete("handoff", prompts.handoff_messages(logs_text), _json)
+    return handoff
+
+
+async def merge_handoffs(partials: list) -> dict:
+    handoff, _ = await complete("handoff_merge", prompts.merge_messages(partials), _json)
+    return handoff
+
+
+async def update_handoff(previous: dict, new_logs_text: str) -> dict:
+    handoff, _ = await complete("handoff_update", prompts.update_messages(previous, new_logs_text), _json)
+    return handoff
+
+
+async def summarize_conversation(previous_summary: str, messages: list) -> str:
+    summary, _ = await complete("chat_summary", prompts.summary_messages(previous_summary, messages))
+    return summary or (previous_summary or "").strip()
+
+
+async def chat_agent(message: str, patient_context: str, history: list) -> str:
+    reply, _ = await complete("chat", prompts.chat_messages(message, patient_context, history))
+    return reply or "Sorry, I couldn't process that. Please try again."
+
+
+async def stream_chat_agent(message: str, patient_context: str, history: list):
+    """Yields reply text deltas from the first healthy provider on the chat route.
+
+    Failover only happens before the first token; a provider without streaming
+    sends its whole reply as one delta. Closing the generator closes upstream.
+    """
+    messages = prompts.chat_messages(message, patient_context, history)
+    errors = []
+    order = _order("chat", messages)
+    for i, provider in enumerate(order):
+        last = i == len(order) - 1
+        if provider not in STREAMS:
+            try:
+                reply = await _call(provider, "chat", messages, _text, _attempt_deadline("chat", provider, last))
+            except Exception as e:
+                errors.append(e)
+                continue
+            yield reply
+            return
+
+        health = provider_health[provider]
+        if not health.begin():
+            errors.append(CircuitOpen(f"{provider} circuit open"))
+            continue
+        start = time.perf_counter()
+        started = False
+        tokens = STREAMS[provider](messages, _attempt_deadline("chat_stream", provider, last))
+        try:
+            async for text in tokens:
+                if not started:
+                    # time to first token is what a streaming caller waits on
+                    started = True
+                    health.record("chat_stream", _ms(start), ok=True)
+                yield text
+        except asyncio.CancelledError:
+            if not started:
+                health.abandon()
+            raise
+        except Exception as e:
+            health.record("chat_stream", _ms(start), ok=False)
+            if started:
+                raise
+            errors.append(e)
+            metrics.inc("nursesync_llm_failovers_total", task="chat_stream", provider=provider)
+            continue
+        finally:
+            await tokens.aclose()
+        if not started:
+            health.record("chat_stream", _ms(start), ok=True)
+        return
+    raise errors[0] if errors else CircuitOpen("no LLM provider available for chat")
+
+
+def health() -> dict:
+    return {
+        "routes": ROUTES,
+        "hedge_tasks": sorted(LLM_HEDGE_TASKS) if LLM_HEDGE else [],
+        "breaker": LLM_BREAKER,
+        "providers": {name: h.snapshot() for name, h in provider_health.items()},
+    }
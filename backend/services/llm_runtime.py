@@ -0,0 +1,135 @@
+import asyncio
+import os
+import random
+from contextlib import asynccontextmanager
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "50"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+
+_http_client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    # one keep-alive pool shared by every httpx-based LLM provider
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_POOL_SIZE,
+                max_keepalive_connections=LLM_POOL_SIZE,
+            ),
+            timeout=httpx.Timeout(None, connect=LLM_CONNECT_TIMEOUT),
+        )
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _status_code(error: BaseException) -> int | None:
+    # openai/httpx-style status_code, google api_core's code, or an attached response's status
+    for value in (
+        getattr(error, "status_code", None),
+        getattr(error, "code", None),
+        getattr(getattr(error, "response", None), "status_code", None),
+    ):
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_transient(error: BaseException) -> bool:
+    """Worth retrying: timeouts, dropped connections, 429 and 5xx.
+
+    Anything else (400, 401/403, a bad request body) fails the same way again.
+    """
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    status = _status_code(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    # SDK connection errors that carry no status, e.g. openai.APIConnectionError / APITimeoutError
+    return any(cls.__name__ in ("APIConnectionError", "APITimeoutError") for cls in type(error).__mro__)
+
+
+class ProviderLimiter:
+    """Caps in-flight calls to one provider and applies a deadline plus jittered retries of transient errors."""
+
+    def __init__(self, name: str, concurrency: int, timeout: float, retries: int, backoff: float):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    @classmethod
+    def from_env(cls, name: str, concurrency: int = 8, timeout: float = 30, retries: int = 2, backoff: float = 0.5):
+        prefix = name.upper()
+        return cls(
+            name,
+            concurrency=int(os.getenv(f"{prefix}_CONCURRENCY", str(concurrency))),
+            timeout=float(os.getenv(f"{prefix}_TIMEOUT", str(timeout))),
+            retries=int(os.getenv(f"{prefix}_RETRIES", str(retries))),
+            backoff=float(os.getenv(f"{prefix}_BACKOFF", str(backoff))),
+        )
+
+    async def _attempt(self, fn, args, kwargs, timeout: float = None):
+        timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+        async with self.semaphore:
+            return await asyncio.wait_for(fn(*args, **kwargs), timeout=timeout)
+
+    def _retry_delay(self, attempt: int) -> float:
+        # full jitter exponential backoff, taken outside the semaphore
+        return random.uniform(0, self.backoff * (2 ** attempt))
+
+    async def call(self, fn, *args, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return await self._attempt(fn, args, kwargs)
+            except Exception as e:
+                if attempt >= self.retries or not is_transient(e):
+                    raise
+                await asyncio.sleep(self._retry_delay(attempt))
+                attempt += 1
+
+    @asynccontextmanager
+    async def holding(self, fn, *args, deadline: float = None, **kwargs):
+        """Open fn(...) with a slot per try, then keep that slot for the body of the block.
+
+        For results that stay in use after the call returns, e.g. a response stream.
+        Retries like call(), or tries once within deadline when one is given; between
+        tries the slot is released, so backoff is never slept while holding it.
+        """
+        attempt = 0
+        while True:
+            await self.semaphore.acquire()
+            try:
+                result = await asyncio.wait_for(
+                    fn(*args, **kwargs),
+                    timeout=self.timeout if deadline is None else min(deadline, self.timeout),
+                )
+                break
+            except BaseException as e:
+                self.semaphore.release()
+                if deadline is not None or attempt >= self.retries or not is_transient(e):
+                    raise
+            await asyncio.sleep(self._retry_delay(attempt))
+            attempt += 1
+        try:
+            yield result
+        finally:
+            self.semaphore.release()
+
+    async def attempt(self, fn, *args, deadline: float = None, **kwargs):
+        """One try within min(deadline, timeout) and no retries, for callers that fail over elsewhere."""
+        return await self._attempt(fn, args, kwargs, deadline)
@@ -0,0 +1,28 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class KeyedLocks:
+    """One asyncio.Lock per key (a shift, a chat session), dropped once nobody holds or waits on it."""
+
+    def __init__(self):
+        self._locks: dict = {}  # key -> [lock, holders + waiters]
+
+    @asynccontextmanager
+    async def hold(self, key: str):
+        entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    def locked(self, key: str) -> bool:
+        entry = self._locks.get(key)
+        return entry is not None and entry[0].locked()
+
+    def __len__(self) -> int:
+        return len(self._locks)
@@ -1,61 +1,60 @@
-from openai import OpenAI
 import os
 from dotenv import load_dotenv
+from services.llm_runtime import ProviderLimiter, get_http_client
 
 load_dotenv()
 
-client = OpenAI(
-    base_url="https://ai.megallm.io/v1",
-    api_key=os.getenv("MEGALLM_API_KEY")
-)
-
-async def clean_transcript(raw_transcript: str) -> str:
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",  # check megallm docs for available models
-        messages=[
-            {
-                "role": "system",
-                "content": """You are a medical transcription corrector for nurses.
-Fix spelling, grammar, and especially medical terms like:
-- medication names (paracetamol, ibuprofen, amoxicillin etc.)
-- dosages (10mg, 500mg etc.)
-- medical procedures (dressing, IV, catheter etc.)
-- patient names(can be indian or foreign names so be carefull about them check common names that like ishan, aryan, arnav, anshuman, laksh, daksh, etc)
-Return ONLY the corrected transcript, nothing else."""
-            },
-            {
-                "role": "user",
-                "content": f"Fix this nurse transcript: {raw_transcript}"
-            }
-        ]
-    )
-    return response.choices[0].message.content.strip()
-
-
-async def chat_agent(message: str, patient_context: str, history: list) -> str:
-    messages = [
-        {
-            "role": "system",
-            "content": """You are NurseSync AI, a clinical assistant for nurses.
-Answer questions about medications, procedures, and patient care concisely.
-Always recommend consulting a doctor for critical decisions.
-Patient context: """ + patient_context
-        }
-    ]
-
-    # add conversation history
-    for msg in history:
-        messages.append(msg)
-
-    # add current message
-    messages.append({"role": "user", "content": message})
-
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=messages
-    )
-
-    content = response.choices[0].message.content
-    if not content:
-        return "Sorry, I couldn't process that. Please try again."
-    return content.strip()
\ No newline at end of file
+megallm_limiter = ProviderLimiter.from_env("megallm")
+
+MEGALLM_MODEL = os.getenv("MEGALLM_MODEL", "gpt-4o-mini")  # check megallm docs for available models
+
+_client = None
+
+def _get_client():
+    global _client
+    if _client is None:
+        from openai import AsyncOpenAI
+        # retries and deadlines are owned by megallm_limiter, not the SDK
+        _client = AsyncOpenAI(
+            base_url="https://ai.megallm.io/v1",
+            api_key=os.getenv("MEGALLM_API_KEY"),
+            http_client=get_http_client(),
+            max_retries=0,
+        )
+    return _client
+
+def warm_up():
+    _get_client()
+
+
+async def complete(messages: list, deadline: float = None) -> str:
+    """One completion for chat-style messages (text content only).
+
+    With a deadline there is a single attempt and no limiter retries.
+    """
+    create = _get_client().chat.completions.create
+    if deadline is None:
+        response = await megallm_limiter.call(create, model=MEGALLM_MODEL, messages=messages)
+    else:
+        response = await megallm_limiter.attempt(create, model=MEGALLM_MODEL, messages=messages, deadline=deadline)
+    return response.choices[0].message.content or ""
+
+
+async def stream(messages: list, deadline: float = None):
+    """Yields reply text deltas as MegaLLM generates them.
+
+    Only opening the stream is retried, or tried once within deadline when one
+    is given; the limiter slot is then held until the stream ends. Closing the
+    generator (e.g. the client went away) closes the upstream response so
+    generation stops there too.
+    """
+    create = _get_client().chat.completions.create
+    async with megallm_limiter.holding(
+        create, model=MEGALLM_MODEL, messages=messages, stream=True, deadline=deadline,
+    ) as response:
+        try:
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await response.close()
@@ -0,0 +1,148 @@
+import functools
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Server-Timing header on every response, for debugging from the browser or curl
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+
+# seconds; spans a cache hit through a slow Whisper or Gemini call
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+_histograms: dict = {}  # (name, labels) -> [bucket counts, sum, count]
+_counters: dict = {}    # (name, labels) -> value
+_gauges: dict = {}      # (name, labels) -> value
+_help = {
+    "nursesync_stage_duration_seconds": ("histogram", "Latency of one pipeline stage call"),
+    "nursesync_stage_in_flight": ("gauge", "Stage calls currently running"),
+    "nursesync_stage_errors_total": ("counter", "Stage calls that raised"),
+    "nursesync_http_request_duration_seconds": ("histogram", "HTTP request latency by route"),
+    "nursesync_http_requests_in_flight": ("gauge", "HTTP requests currently being handled"),
+    "nursesync_cache_events_total": ("counter", "Cache lookups by outcome"),
+    "nursesync_cache_entries": ("gauge", "Entries held in memory by each cache"),
+    "nursesync_audio_seconds_total": ("counter", "Audio seconds reaching STT preprocessing (input) and trimmed as silence"),
+    "nursesync_stt_saved_seconds_total": ("counter", "Estimated STT inference time saved by trimming silence"),
+    "nursesync_stt_rejected_total": ("counter", "Recordings rejected as empty before STT"),
+    "nursesync_llm_circuit_state": ("gauge", "LLM provider circuit: 0 closed, 1 half-open, 2 open"),
+    "nursesync_llm_circuit_trips_total": ("counter", "Times an LLM provider circuit opened"),
+    "nursesync_llm_slow_calls_total": ("counter", "LLM calls far slower than the task's running average"),
+    "nursesync_llm_failovers_total": ("counter", "LLM calls retried on the next provider, by the provider that failed"),
+    "nursesync_llm_hedges_total": ("counter", "Hedged LLM calls, by the provider started as backup"),
+    "nursesync_chat_ttft_seconds": ("histogram", "Streamed chat: time to the first reply token"),
+    "nursesync_chat_stream_seconds": ("histogram", "Streamed chat: time to the complete reply"),
+}
+
+# per-request (stage, provider, ms) list, filled while a request is being handled
+request_timings: ContextVar = ContextVar("request_timings", default=None)
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name: str, seconds: float, **labels):
+    entry = _histograms.setdefault(_key(name, labels), [[0] * len(BUCKETS), 0.0, 0])
+    for i, bound in enumerate(BUCKETS):
+        if seconds <= bound:
+            entry[0][i] += 1
+    entry[1] += seconds
+    entry[2] += 1
+
+
+def inc(name: str, amount: float = 1, **labels):
+    key = _key(name, labels)
+    _counters[key] = _counters.get(key, 0) + amount
+
+
+def gauge_add(name: str, delta: float, **labels):
+    key = _key(name, labels)
+    _gauges[key] = _gauges.get(key, 0) + delta
+
+
+def gauge_set(name: str, value: float, **labels):
+    _gauges[_key(name, labels)] = value
+
+
+@contextmanager
+def stage(name: str, provider: str = "local"):
+    """Time a block as one call of a pipeline stage; works around awaits too."""
+    labels = {"stage": name, "provider": provider}
+    gauge_add("nursesync_stage_in_flight", 1, **labels)
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        inc("nursesync_stage_errors_total", error=type(e).__name__, **labels)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        gauge_add("nursesync_stage_in_flight", -1, **labels)
+        observe("nursesync_stage_duration_seconds", elapsed, **labels)
+        timings = request_timings.get()
+        if timings is not None:
+            timings.append((name, provider, elapsed * 1000))
+
+
+def timed(name: str, provider="local"):
+    """Decorator for async functions; provider may be a str or a fn(args, kwargs) -> str."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            label = provider(args, kwargs) if callable(provider) else provider
+            with stage(name, label):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def observe_caches(caches: dict):
+    # TTLCache.stats() counters are cumulative, so they are mirrored rather than added
+    for cache, stats in caches.items():
+        for outcome in ("hits", "store_hits", "misses"):
+            _counters[_key("nursesync_cache_events_total", {"cache": cache, "outcome": outcome})] = stats.get(outcome, 0)
+        _gauges[_key("nursesync_cache_entries", {"cache": cache})] = stats.get("size", 0)
+
+
+def _labels(labels: tuple, extra: dict = None) -> str:
+    items = list(labels) + list((extra or {}).items())
+    if not items:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+def render() -> str:
+    """Everything recorded so far in the Prometheus text exposition format."""
+    lines = []
+    described = set()
+
+    def describe(name):
+        if name not in described and name in _help:
+            kind, text = _help[name]
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            described.add(name)
+
+    for (name, labels), (buckets, total, count) in sorted(_histograms.items()):
+        describe(name)
+        for bound, hits in zip(BUCKETS, buckets):
+            lines.append(f"{name}_bucket{_labels(labels, {'le': bound})} {hits}")
+        lines.append(f"{name}_bucket{_labels(labels, {'le': '+Inf'})} {count}")
+        lines.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+        lines.append(f"{name}_count{_labels(labels)} {count}")
+    for (name, labels), value in sorted(_counters.items()) + sorted(_gauges.items()):
+        describe(name)
+        lines.append(f"{name}{_labels(labels)} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def server_timing(timings: list, total_ms: float) -> str:
+    # repeated stages (e.g. several db calls) are summed
+    merged = {}
+    for name, provider, ms in timings:
+        key = f"{name}.{provider}" if provider != "local" else name
+        merged[key] = merged.get(key, 0) + ms
+    parts = [f"{key.replace(':', '_')};dur={ms:.1f}" for key, ms in merged.items()]
+    parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts)
@@ -0,0 +1,178 @@
+import asyncio
+import os
+import re
+from datetime import datetime, timedelta, timezone
+
+from services import job_queue
+from services.db import download_from_storage, get_logs, get_medication_schedule, save_medication_schedule
+from services.fast_extract import canonical_medication
+from services.llm_gateway import parse_prescription
+
+# dose rounds are on the ward clock; default is IST
+SCHEDULE_UTC_OFFSET_MIN = int(os.getenv("SCHEDULE_UTC_OFFSET_MIN", "330"))
+# a dose is overdue this long after its round with no matching medication log
+OVERDUE_GRACE_MIN = int(os.getenv("OVERDUE_GRACE_MIN", "60"))
+# a log this long before the round still counts as that round's dose
+EARLY_DOSE_MIN = 90
+
+# standard administration rounds, as hours on the ward clock
+DOSE_ROUNDS = {
+    "od": [9], "once daily": [9], "daily": [9],
+    "bd": [9, 21], "bid": [9, 21], "twice daily": [9, 21],
+    "tds": [8, 14, 20], "tid": [8, 14, 20], "thrice daily": [8, 14, 20],
+    "qid": [6, 12, 18, 22], "four times daily": [6, 12, 18, 22],
+    "hs": [21], "at night": [21],
+}
+_INTERVAL_RE = re.compile(r"^(?:q\s*(\d+)\s*h|every (\d+) hours?)$")
+
+_ward_tz = timezone(timedelta(minutes=SCHEDULE_UTC_OFFSET_MIN))
+
+
+def due_hours(frequency: str | None) -> list:
+    """Ward-clock hours a frequency is given at; [] for STAT, SOS/PRN and anything unrecognised."""
+    freq = (frequency or "").strip().lower().rstrip(".")
+    if freq in DOSE_ROUNDS:
+        return DOSE_ROUNDS[freq]
+    match = _INTERVAL_RE.match(freq)
+    if match:
+        every = int(match.group(1) or match.group(2))
+        if 0 < every <= 24:
+            return sorted({(6 + k * every) % 24 for k in range(24 // every)})
+    return []
+
+
+def normalize_item(item: dict) -> dict | None:
+    drug = canonical_medication(item.get("drug"))
+    if not drug:
+        return None
+    return {
+        "drug": drug,
+        "dose": (item.get("dose") or "").strip() or None,
+        "frequency": (item.get("frequency") or "").strip().upper() or None,
+        "route": (item.get("route") or "").strip().upper() or None,
+    }
+
+
+def _dose_key(dose: str | None) -> str:
+    return re.sub(r"\s+", "", (dose or "").lower()).replace("gm", "g").replace("iu", "units")
+
+
+def compact_context(schedule: list) -> str:
+    # "paracetamol 500 mg PO TDS; ceftriaxone 1 g IV BD": what extraction needs, nothing more
+    if not schedule:
+        return "none"
+    return "; ".join(
+        " ".join(v for v in (row["drug"], row.get("dose"), row.get("route"), row.get("frequency")) if v)
+        for row in schedule
+    )
+
+
+def matches_schedule(structured: dict, schedule: list) -> bool:
+    drug = canonical_medication(structured.get("medication"))
+    if not drug:
+        return False
+    for row in schedule:
+        if row["drug"] != drug:
+            continue
+        given, prescribed = _dose_key(structured.get("dose")), _dose_key(row.get("dose"))
+        if not given or not prescribed or given == prescribed:
+            return True
+    return False
+
+
+async def resolve_context(patient_id: str, client_context: str) -> tuple[str, list]:
+    """(prescription context for extraction, parsed schedule). The server index wins over client text."""
+    schedule = await get_medication_schedule(patient_id) if patient_id else []
+    if schedule:
+        return compact_context(schedule), schedule
+    return client_context, []
+
+
+def ward_time(log: dict) -> datetime | None:
+    # a log's created_at (stored in UTC) on the ward clock
+    try:
+        created = datetime.fromisoformat(str(log.get("created_at")).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=timezone.utc)
+    return created.astimezone(_ward_tz)
+
+
+def overdue_doses(schedule: list, logs: list, now: datetime = None) -> list:
+    """Most recent round per scheduled drug that has passed its grace period with no dose logged."""
+    now = (now or datetime.now(timezone.utc)).astimezone(_ward_tz)
+    cutoff = now - timedelta(minutes=OVERDUE_GRACE_MIN)
+    given = {}
+    for log in logs:
+        drug = canonical_medication((log.get("structured_log") or {}).get("medication"))
+        at = ward_time(log)
+        if drug and at:
+            given.setdefault(drug, []).append(at)
+
+    overdue = []
+    for row in schedule:
+        rounds = [
+            day.replace(hour=hour, minute=0, second=0, microsecond=0)
+            for day in (now - timedelta(days=1), now)
+            for hour in due_hours(row.get("frequency"))
+        ]
+        passed = [r for r in rounds if r <= cutoff and r > now - timedelta(days=1)]
+        if not passed:
+            continue
+        due = max(passed)
+        window_start = due - timedelta(minutes=EARLY_DOSE_MIN)
+        if any(t >= window_start for t in given.get(row["drug"], [])):
+            continue
+        overdue.append({
+            "drug": row["drug"],
+            "dose": row.get("dose"),
+            "route": row.get("route"),
+            "frequency": row.get("frequency"),
+            "due": due.strftime("%H:%M"),
+            "minutes_overdue": int((now - due).total_seconds() // 60),
+        })
+    return overdue
+
+
+async def patient_schedule(patient_id: str) -> dict:
+    schedule = await get_medication_schedule(patient_id)
+    logs = []
+    if any(due_hours(row.get("frequency")) for row in schedule):
+        logs = await get_logs(patient_id, limit=200, columns="created_at,structured_log")
+    return {"medications": schedule, "overdue": overdue_doses(schedule, logs)}
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def schedule_parse(prescription_id: str, patient_id: str, source: dict, mime_type: str | None) -> str:
+    """Queue parsing of a stored prescription; source is {"bucket", "object"} or a local {"path"}.
+
+    Parsing is one multimodal LLM call, so it runs on the job queue, not the upload
+    request. The job row carries only where the file is; the worker fetches it.
+    """
+    return await job_queue.enqueue("prescription", {
+        "prescription_id": prescription_id,
+        "patient_id": patient_id,
+        "mime_type": mime_type or "application/pdf",
+        **source,
+    })
+
+
+async def _load_prescription(payload: dict) -> bytes:
+    if "path" in payload:
+        return await asyncio.to_thread(_read_file, payload["path"])
+    return await download_from_storage(payload["bucket"], payload["object"])
+
+
+async def index_prescription_job(payload: dict, blob: bytes) -> dict:
+    # job_queue handler: parse the uploaded file and store its medication rows;
+    # the LLM takes the file whole, so it is read here, only once the job runs
+    content = blob if blob is not None else await _load_prescription(payload)
+    items = await parse_prescription(content, payload["mime_type"])
+    rows = [row for row in (normalize_item(i) for i in items) if row]
+    await save_medication_schedule(payload["patient_id"], payload["prescription_id"], rows)
+    return {"medications": rows}
@@ -0,0 +1,192 @@
+"""Prompt text for every LLM task, as provider-neutral chat messages.
+
+Each builder returns [{"role": ..., "content": ...}]; services/llm_gateway sends
+the same messages to whichever provider serves the call.
+"""
+import base64
+import json
+
+LOG_EXTRACTION_PROMPT = """You are a clinical log extractor for nurses.
+Given a nurse's voice note transcript, extract structured data.
+Return ONLY valid JSON, nothing else, no markdown.
+
+{{
+  "patient_name": "string or null",
+  "action_type": "medication|vitals|dressing|observation|note",
+  "medication": "string or null",
+  "dose": "string or null",
+  "time_mentioned": "string or null",
+  "notes": "any additional observations",
+  "priority": "high|medium|low",
+  "matched_prescription": false,
+  "confidence": 0.95
+}}
+
+Transcript: {transcript}
+Prescription context: {prescription}"""
+
+CLEAN_AND_EXTRACT_PROMPT = """You are a medical transcription corrector and clinical log extractor for nurses.
+First fix spelling, grammar, and especially medical terms in the raw transcript:
+- medication names (paracetamol, ibuprofen, amoxicillin etc.)
+- dosages (10mg, 500mg etc.)
+- medical procedures (dressing, IV, catheter etc.)
+- patient names (can be indian or foreign names, e.g. ishan, aryan, arnav, anshuman, laksh, daksh)
+Then extract structured data from the corrected transcript.
+Return ONLY valid JSON, nothing else, no markdown.
+
+{{
+  "clean_transcript": "the corrected transcript",
+  "patient_name": "string or null",
+  "action_type": "medication|vitals|dressing|observation|note",
+  "medication": "string or null",
+  "dose": "string or null",
+  "time_mentioned": "string or null",
+  "notes": "any additional observations",
+  "priority": "high|medium|low",
+  "matched_prescription": false,
+  "confidence": 0.95
+}}
+
+Raw transcript: {transcript}
+Prescription context: {prescription}"""
+
+CLEAN_TRANSCRIPT_PROMPT = """You are a medical transcription corrector for nurses.
+Fix spelling, grammar, and especially medical terms like:
+- medication names (paracetamol, ibuprofen, amoxicillin etc.)
+- dosages (10mg, 500mg etc.)
+- medical procedures (dressing, IV, catheter etc.)
+- patient names(can be indian or foreign names so be carefull about them check common names that like ishan, aryan, arnav, anshuman, laksh, daksh, etc)
+Return ONLY the corrected transcript, nothing else."""
+
+PRESCRIPTION_PARSE_PROMPT = """You are reading a doctor's prescription for a hospital ward.
+List every medication prescribed.
+Return ONLY valid JSON, nothing else, no markdown:
+
+{"medications": [
+  {"drug": "generic name", "dose": "e.g. 500 mg", "frequency": "OD|BD|TDS|QID|HS|q4h|q6h|q8h|q12h|STAT|SOS or as written", "route": "PO|IV|IM|SC|inhaled|topical or null"}
+]}"""
+
+HANDOFF_JSON_SHAPE = """{
+  "summary": "Professional 2-3 sentence shift summary here",
+  "pending_tasks": ["specific task 1", "specific task 2"],
+  "high_priority": ["urgent item 1", "urgent item 2"]
+}"""
+
+# logs arrive pre-encoded by services/handoff_engine.encode_logs
+LOG_FORMAT_NOTE = "Logs are grouped under one '## patient' header per patient, one per line: ward-clock time | action | medication dose | time mentioned | priority | notes"
+
+CHAT_SYSTEM_PROMPT = """You are NurseSync AI, a clinical assistant for nurses.
+Answer questions about medications, procedures, and patient care concisely.
+Always recommend consulting a doctor for critical decisions.
+Patient context: """
+
+CHAT_SUMMARY_PROMPT = """You maintain a running summary of a nurse's chat with a clinical assistant.
+Merge the earlier summary with the new turns into at most 5 short sentences.
+Keep patient names, medications, doses, times and any open questions. Return ONLY the summary."""
+
+
+def _user(content) -> list:
+    return [{"role": "user", "content": content}]
+
+
+def has_media(messages: list) -> bool:
+    # list content carries media parts, which only multimodal providers accept
+    return any(isinstance(m["content"], list) for m in messages)
+
+
+def clean_messages(raw_transcript: str) -> list:
+    return [
+        {"role": "system", "content": CLEAN_TRANSCRIPT_PROMPT},
+        {"role": "user", "content": f"Fix this nurse transcript: {raw_transcript}"},
+    ]
+
+
+def extract_messages(transcript: str, prescription: str) -> list:
+    return _user(LOG_EXTRACTION_PROMPT.format(transcript=transcript, prescription=prescription))
+
+
+def clean_and_extract_messages(raw_transcript: str, prescription: str) -> list:
+    return _user(CLEAN_AND_EXTRACT_PROMPT.format(transcript=raw_transcript, prescription=prescription))
+
+
+def prescription_messages(content: bytes, mime_type: str) -> list:
+    if mime_type.startswith("text/"):
+        return _user(f"{PRESCRIPTION_PARSE_PROMPT}\n\nPrescription:\n{content.decode(errors='replace')}")
+    return _user([
+        {"type": "text", "text": PRESCRIPTION_PARSE_PROMPT},
+        {"type": "media", "mime_type": mime_type, "data": base64.b64encode(content).decode()},
+    ])
+
+
+def handoff_messages(logs_text: str) -> list:
+    return _user(f"""You are a senior clinical nurse summarizing a shift for handoff.
+Given these nurse logs, write a clear, professional handoff summary.
+
+Rules:
+- Summary should be 2-3 sentences, written like a real nurse handoff
+- Extract genuinely pending/incomplete tasks only
+- High priority = anything overdue, missed, or flagged urgent
+- Be specific — include patient names, medications, doses
+
+Return ONLY valid JSON, no markdown:
+{HANDOFF_JSON_SHAPE}
+
+{LOG_FORMAT_NOTE}
+Shift logs:
+{logs_text}""")
+
+
+def merge_messages(partials: list) -> list:
+    # reduce step: combine per-patient summaries into one shift handoff
+    return _user(f"""You are a senior clinical nurse writing the handoff for a whole shift.
+Below are handoff summaries already written for each patient. Merge them.
+
+Rules:
+- Summary should be 2-3 sentences, written like a real nurse handoff
+- Keep every pending task and high priority item, merging exact duplicates only
+- Be specific — include patient names, medications, doses
+
+Return ONLY valid JSON, no markdown:
+{HANDOFF_JSON_SHAPE}
+
+Per-patient summaries:
+{json.dumps(partials, separators=(",", ":"))}""")
+
+
+def update_messages(previous: dict, new_logs_text: str) -> list:
+    # fold a few new logs into an existing rolling summary instead of re-reading the whole shift
+    return _user(f"""You are a senior clinical nurse maintaining a running shift handoff summary.
+Update the current summary with the new nurse logs below.
+
+Rules:
+- Summary should stay 2-3 sentences, written like a real nurse handoff
+- Remove pending tasks the new logs show as done, add new genuinely pending ones
+- High priority = anything overdue, missed, or flagged urgent
+- Be specific — include patient names, medications, doses
+
+Return ONLY valid JSON, no markdown:
+{HANDOFF_JSON_SHAPE}
+
+Current summary:
+{json.dumps(previous, separators=(",", ":"))}
+
+{LOG_FORMAT_NOTE}
+New shift logs:
+{new_logs_text}""")
+
+
+def chat_messages(message: str, patient_context: str, history: list) -> list:
+    return [
+        {"role": "system", "content": CHAT_SYSTEM_PROMPT + patient_context},
+        *history,
+        {"role": "user", "content": message},
+    ]
+
+
+def summary_messages(previous_summary: str, messages: list) -> list:
+    # compacts older chat turns so the prompt only carries a short summary of them
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    return [
+        {"role": "system", "content": CHAT_SUMMARY_PROMPT},
+        {"role": "user", "content": f"Earlier summary: {previous_summary or 'none'}\n\nNew turns:\n{transcript}"},
+    ]
@@ -0,0 +1,41 @@
+import hashlib
+import os
+
+from services.cache import TTLCache, DiskStore
+
+# content-addressed: the same audio or transcript always maps to the same key,
+# so resubmits from flaky Wi-Fi skip Whisper/Sarvam and the LLM entirely
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "data/cache")
+RESULT_CACHE_DISK_MB = float(os.getenv("RESULT_CACHE_DISK_MB", "256"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", str(7 * 86400)))
+
+
+def _disk(name: str, share: float):
+    if RESULT_CACHE_DISK_MB <= 0:
+        return None
+    return DiskStore(os.path.join(RESULT_CACHE_DIR, name), int(RESULT_CACHE_DISK_MB * share * 1024 * 1024))
+
+
+stt_cache = TTLCache(
+    maxsize=int(os.getenv("STT_CACHE_SIZE", "256")),
+    ttl=RESULT_CACHE_TTL,
+    store=_disk("stt", 0.5),
+)
+extract_cache = TTLCache(
+    maxsize=int(os.getenv("EXTRACT_CACHE_SIZE", "1024")),
+    ttl=RESULT_CACHE_TTL,
+    store=_disk("extract", 0.5),
+)
+
+
+def stt_key(audio_bytes: bytes, provider: str, model: str, language: str) -> str:
+    return f"stt:{provider}:{model}:{language}:{hashlib.sha256(audio_bytes).hexdigest()}"
+
+
+def extract_key(transcript: str, prescription: str) -> str:
+    digest = hashlib.sha256(f"{transcript}\x00{prescription}".encode()).hexdigest()
+    return f"extract:{digest}"
+
+
+def stats() -> dict:
+    return {"stt": stt_cache.stats(), "extract": extract_cache.stats()}
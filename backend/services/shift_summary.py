@@ -0,0 +1,68 @@
+import asyncio
+
+from services.db import delete_shift_summary, get_logs_by_shift, get_shift_summary, save_shift_summary
+from services.llm_gateway import update_handoff
+from services.handoff_engine import encode_logs, summarize_logs, HANDOFF_LOG_COLUMNS
+from services.locks import KeyedLocks
+
+# one fold at a time per shift; a fold always picks up every log not yet folded in
+_locks = KeyedLocks()
+_scheduled: set = set()
+_tasks: set = set()
+
+
+async def fold_shift(shift_id: str, logs: list = None) -> dict | None:
+    """Merge any logs not yet in the shift's rolling summary and persist it."""
+    async with _locks.hold(shift_id):
+        _scheduled.discard(shift_id)
+        current = await get_shift_summary(shift_id)
+        if logs is None:
+            logs = await get_logs_by_shift(shift_id, columns=HANDOFF_LOG_COLUMNS)
+
+        folded_ids = list(current["folded_log_ids"]) if current else []
+        folded = set(folded_ids)
+        new_logs = [log for log in logs if log["id"] not in folded]
+        previous = {
+            "summary": current["summary"],
+            "pending_tasks": current["pending_tasks"],
+            "high_priority": current["high_priority"],
+        } if current else None
+
+        if not new_logs:
+            return previous
+
+        if previous:
+            summary = await update_handoff(previous, encode_logs(new_logs))
+        else:
+            summary, _ = await summarize_logs(new_logs)
+        await save_shift_summary(shift_id, summary, folded_ids + [log["id"] for log in new_logs])
+        return summary
+
+
+async def refold_shift(shift_id: str):
+    """Drop the rolling summary so the next fold rebuilds it from every log in the shift.
+
+    For edits: the summary already quotes the old text, and folding only adds new logs.
+    The row lives in the database, so every worker process sees the reset.
+    """
+    async with _locks.hold(shift_id):
+        await delete_shift_summary(shift_id)
+    schedule_fold(shift_id)
+
+
+async def _fold_in_background(shift_id: str):
+    try:
+        await fold_shift(shift_id)
+    except Exception as e:
+        # the next fold, or /shift/end, will pick these logs up again
+        print(f"⚠️  rolling summary for shift {shift_id} failed: {e}")
+
+
+def schedule_fold(shift_id: str):
+    # called after every saved log; coalesces if a fold is already queued for this shift
+    if not shift_id or shift_id in _scheduled:
+        return
+    _scheduled.add(shift_id)
+    task = asyncio.create_task(_fold_in_background(shift_id))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
@@ -1,16 +1,90 @@
 import asyncio
+import io
 import os
 import tempfile
+import threading
+import time
 
-from sarvamai import SarvamAI
-import whisper
+import numpy as np
 
-whisper_model = whisper.load_model("base")
+from services.audio import EmptyRecording, decode_audio, estimate_duration, preprocess_audio
+from services.llm_runtime import ProviderLimiter, get_http_client
+from services.whisper_server import send_frame, recv_frame, WHISPER_MODEL_NAME, SAMPLE_RATE
+from services.result_cache import stt_cache, stt_key
+from services.metrics import inc, stage
+
+# "memory" decodes uploads in-process; "tempfile" is the legacy disk + ffmpeg path
+STT_DECODE = os.getenv("STT_DECODE", "memory").strip().lower()
+
+# shared inference server (services/whisper_server.py), e.g. "127.0.0.1:8765"
+WHISPER_SERVER_ADDR = os.getenv("WHISPER_SERVER_ADDR", "").strip()
+WHISPER_SERVER_CONNECT_TIMEOUT = float(os.getenv("WHISPER_SERVER_CONNECT_TIMEOUT", "0.5"))
+WHISPER_SERVER_RETRY_AFTER = float(os.getenv("WHISPER_SERVER_RETRY_AFTER", "5"))
+# a server reply slower than base + per-second x note length means a stuck or dead worker
+WHISPER_SERVER_TIMEOUT = float(os.getenv("WHISPER_SERVER_TIMEOUT", "30"))
+WHISPER_SERVER_TIMEOUT_PER_S = float(os.getenv("WHISPER_SERVER_TIMEOUT_PER_S", "2"))
+
+# "auto" routing: hedge to the other provider when the first misses its expected latency
+STT_HEDGE = os.getenv("STT_HEDGE", "0") == "1"
+STT_HEDGE_FACTOR = float(os.getenv("STT_HEDGE_FACTOR", "1.5"))
+STT_HEDGE_MIN_MS = float(os.getenv("STT_HEDGE_MIN_MS", "1000"))
+# resample to 16 kHz mono and trim leading/trailing silence before any provider sees a note
+STT_PREPROCESS = os.getenv("STT_PREPROCESS", "1") == "1"
+# shared server queue stats are fetched at most this often when routing
+STT_SERVER_STATS_TTL = float(os.getenv("STT_SERVER_STATS_TTL", "1"))
+
+sarvam_limiter = ProviderLimiter.from_env("sarvam", concurrency=8, timeout=60, retries=1)
+
+_whisper_model = None
+_whisper_lock = threading.Lock()
+_server_retry_at = 0.0
+_sarvam_client = None
+_sarvam_http = None
+_whisper_in_flight = 0
+_server_stats = (0.0, None)
+
+
+def _get_whisper_model():
+    # in-process fallback model, only loaded if the shared server isn't used
+    global _whisper_model
+    with _whisper_lock:
+        if _whisper_model is None:
+            import whisper  # pulls in torch, so only on first use
+            _whisper_model = whisper.load_model(WHISPER_MODEL_NAME)
+    return _whisper_model
+
+
+def _get_sarvam_client():
+    # one async client for the life of the process, on the shared keep-alive pool
+    global _sarvam_client, _sarvam_http
+    api_key = os.getenv("SARVAM_API_KEY")
+    if not api_key:
+        raise ValueError("SARVAM_API_KEY is not configured.")
+    http_client = get_http_client()
+    if _sarvam_client is None or _sarvam_http is not http_client:
+        from sarvamai import AsyncSarvamAI
+        _sarvam_client = AsyncSarvamAI(api_subscription_key=api_key, httpx_client=http_client)
+        _sarvam_http = http_client
+    return _sarvam_client
+
+
+def warm_up():
+    # nothing to load in this worker when the shared server handles inference
+    if not WHISPER_SERVER_ADDR:
+        _get_whisper_model()
+
+
+def warm_up_sarvam():
+    _get_sarvam_client()
+
+
+def _sarvam_available() -> bool:
+    return bool(os.getenv("SARVAM_API_KEY"))
 
 
 def _normalize_provider(provider: str) -> str:
     provider_norm = (provider or "whisper").strip().lower()
-    if provider_norm not in {"whisper", "sarvam"}:
+    if provider_norm not in {"whisper", "sarvam", "auto"}:
         return "whisper"
     return provider_norm
 
@@ -26,10 +100,7 @@ def _sarvam_language_code(language_hint: str) -> str:
     return "hi-IN" if _normalize_language(language_hint) == "hi" else "en-IN"
 
 
-def _transcribe_with_whisper(tmp_path: str, language_hint: str) -> dict:
-    language = _normalize_language(language_hint)
-    result = whisper_model.transcribe(tmp_path, fp16=False, language=language)
-
+def _format_whisper_result(result: dict, language: str) -> dict:
     segments = result.get("segments", [])
     if segments:
         avg_no_speech = sum(s.get("no_speech_prob", 0) for s in segments) / len(segments)
@@ -45,21 +116,89 @@ def _transcribe_with_whisper(tmp_path: str, language_hint: str) -> dict:
     }
 
 
-def _transcribe_with_sarvam(
-    tmp_path: str,
+def _transcribe_with_whisper(audio, language_hint: str) -> dict:
+    # audio is either a file path or a 16 kHz float32 array
+    language = _normalize_language(language_hint)
+    result = _get_whisper_model().transcribe(audio, fp16=False, language=language)
+    return _format_whisper_result(result, language)
+
+
+class WhisperServerUnavailable(Exception):
+    """The shared Whisper server could not be reached or timed out; in-process inference takes over."""
+
+
+async def _open_server_connection():
+    global _server_retry_at
+    if not WHISPER_SERVER_ADDR or time.monotonic() < _server_retry_at:
+        return None
+    host, _, port = WHISPER_SERVER_ADDR.rpartition(":")
+    try:
+        return await asyncio.wait_for(
+            asyncio.open_connection(host or "127.0.0.1", int(port)),
+            timeout=WHISPER_SERVER_CONNECT_TIMEOUT,
+        )
+    except (OSError, asyncio.TimeoutError):
+        # server absent: use in-process inference for a while before retrying
+        _server_retry_at = time.monotonic() + WHISPER_SERVER_RETRY_AFTER
+        return None
+
+
+async def _transcribe_via_server(audio: np.ndarray, language_hint: str) -> dict | None:
+    global _server_retry_at
+    conn = await _open_server_connection()
+    if conn is None:
+        return None
+    reader, writer = conn
+    language = _normalize_language(language_hint)
+
+    async def round_trip():
+        await send_frame(writer, {"op": "transcribe", "language": language}, audio.astype(np.float32).tobytes())
+        return await recv_frame(reader)
+
+    deadline = WHISPER_SERVER_TIMEOUT + WHISPER_SERVER_TIMEOUT_PER_S * audio.size / SAMPLE_RATE
+    try:
+        header, _ = await asyncio.wait_for(round_trip(), timeout=deadline)
+    except (asyncio.TimeoutError, OSError, asyncio.IncompleteReadError) as e:
+        # stuck worker or dropped connection: this note and the next few go in-process
+        print(f"⚠️ Whisper server unavailable ({type(e).__name__}), falling back to in-process")
+        _server_retry_at = time.monotonic() + WHISPER_SERVER_RETRY_AFTER
+        return None
+    finally:
+        writer.close()
+    if not header.get("ok"):
+        raise RuntimeError(f"Whisper server error: {header.get('error')}")
+    return _format_whisper_result(header["result"], language)
+
+
+async def whisper_server_stats() -> dict | None:
+    """Queue depth / in-flight counts from the shared Whisper server, None if it isn't running."""
+    conn = await _open_server_connection()
+    if conn is None:
+        return None
+    reader, writer = conn
+    try:
+        await send_frame(writer, {"op": "stats"})
+        header, _ = await recv_frame(reader)
+    finally:
+        writer.close()
+    return header
+
+
+async def _transcribe_with_sarvam(
+    audio_bytes: bytes,
+    filename: str,
     language_hint: str,
     mode: str,
     model: str,
 ) -> dict:
-    api_key = os.getenv("SARVAM_API_KEY")
-    if not api_key:
-        raise ValueError("SARVAM_API_KEY is not configured.")
-
-    sarvam = SarvamAI(api_subscription_key=api_key)
+    client = _get_sarvam_client()
     language_code = _sarvam_language_code(language_hint)
 
-    with open(tmp_path, "rb") as audio_file:
-        response = sarvam.speech_to_text.transcribe(
+    async def request():
+        # fresh file object per attempt, so a retry re-sends the whole note
+        audio_file = io.BytesIO(audio_bytes)
+        audio_file.name = filename
+        return await client.speech_to_text.transcribe(
             file=audio_file,
             model=model,
             mode=mode,
@@ -67,6 +206,7 @@ def _transcribe_with_sarvam(
             input_audio_codec="wav",
         )
 
+    response = await sarvam_limiter.call(request)
     confidence = response.language_probability if response.language_probability else 0.9
     return {
         "transcript": (response.transcript or "").strip(),
@@ -76,6 +216,181 @@ def _transcribe_with_sarvam(
     }
 
 
+def _transcribe_file_with_whisper(audio_bytes: bytes, filename: str, language_hint: str) -> dict:
+    ext = os.path.splitext(filename)[1] or ".wav"
+    with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp_file:
+        tmp_file.write(audio_bytes)
+        tmp_path = tmp_file.name
+    try:
+        return _transcribe_with_whisper(tmp_path, language_hint)
+    finally:
+        os.unlink(tmp_path)
+
+
+def _transcribe_bytes_with_whisper(audio_bytes: bytes, language_hint: str) -> dict:
+    return _transcribe_with_whisper(decode_audio(audio_bytes), language_hint)
+
+
+class ProviderLatency:
+    """Running estimate of a provider's latency: fixed overhead plus an EWMA of ms per audio second."""
+
+    def __init__(self, ms_per_second: float, overhead_ms: float, alpha: float = 0.2):
+        self.ms_per_second = ms_per_second
+        self.overhead_ms = overhead_ms
+        self.alpha = alpha
+        self.samples = 0
+
+    def estimate(self, seconds: float) -> float:
+        return self.overhead_ms + self.ms_per_second * seconds
+
+    def observe(self, elapsed_ms: float, seconds: float):
+        rate = max(0.0, elapsed_ms - self.overhead_ms) / max(seconds, 0.5)
+        self.ms_per_second += self.alpha * (rate - self.ms_per_second)
+        self.samples += 1
+
+
+# priors until real calls come in; CPU Whisper "base" runs around 0.4x realtime
+provider_latency = {
+    "whisper": ProviderLatency(
+        float(os.getenv("STT_WHISPER_MS_PER_S", "400")), float(os.getenv("STT_WHISPER_OVERHEAD_MS", "50")),
+    ),
+    "sarvam": ProviderLatency(
+        float(os.getenv("STT_SARVAM_MS_PER_S", "100")), float(os.getenv("STT_SARVAM_OVERHEAD_MS", "500")),
+    ),
+}
+
+
+async def _whisper_backlog() -> float:
+    """Notes ahead of a new one, per Whisper worker."""
+    global _server_stats
+    if WHISPER_SERVER_ADDR and STT_DECODE != "tempfile":
+        fetched_at, stats = _server_stats
+        if time.monotonic() - fetched_at > STT_SERVER_STATS_TTL:
+            try:
+                stats = await whisper_server_stats()
+            except (OSError, asyncio.IncompleteReadError):
+                stats = None
+            _server_stats = (time.monotonic(), stats)
+        if stats:
+            return (stats.get("queued", 0) + stats.get("in_flight", 0)) / max(1, stats.get("workers", 1))
+    return _whisper_in_flight
+
+
+async def route_stt(audio_bytes: bytes) -> tuple[list, dict]:
+    """Providers in the order "auto" should try them, with their estimated latency in ms."""
+    seconds = estimate_duration(audio_bytes)
+    whisper = provider_latency["whisper"]
+    estimates = {"whisper": whisper.estimate(seconds) * (1 + await _whisper_backlog())}
+    if _sarvam_available():
+        estimates["sarvam"] = provider_latency["sarvam"].estimate(seconds)
+    return sorted(estimates, key=estimates.get), estimates
+
+
+async def _run_provider(provider: str, audio_bytes: bytes, filename: str, language_hint: str, stt_mode: str, stt_model: str) -> dict:
+    # feeds the live latency estimates used by "auto"
+    global _whisper_in_flight
+    start = time.perf_counter()
+    if provider == "whisper":
+        _whisper_in_flight += 1
+    try:
+        result = await _transcribe_uncached(audio_bytes, filename, provider, language_hint, stt_mode, stt_model)
+    finally:
+        if provider == "whisper":
+            _whisper_in_flight -= 1
+    provider_latency[provider].observe((time.perf_counter() - start) * 1000, estimate_duration(audio_bytes))
+    return result
+
+
+async def _first_success(order: list, estimates: dict, call) -> tuple[dict, bool]:
+    """Run order[0]; on failure fall over to order[1], and with STT_HEDGE also start it
+    once order[0] overruns its estimate. Returns (result, hedged)."""
+    primary = asyncio.create_task(call(order[0]))
+    deadline = max(STT_HEDGE_MIN_MS, estimates[order[0]] * STT_HEDGE_FACTOR) / 1000
+    if len(order) < 2:
+        return await primary, False
+    done, _ = await asyncio.wait({primary}, timeout=deadline if STT_HEDGE else None)
+    if done:
+        if primary.exception() is None:
+            return primary.result(), False
+        try:
+            return await call(order[1]), False
+        except Exception:
+            raise primary.exception()
+
+    backup = asyncio.create_task(call(order[1]))
+    pending = {primary, backup}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), True
+        raise primary.exception()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _cache_key(audio_bytes: bytes, provider: str, language_hint: str, stt_mode: str, stt_model: str) -> str:
+    model = f"{stt_model}:{stt_mode}" if provider == "sarvam" else WHISPER_MODEL_NAME
+    return stt_key(audio_bytes, provider, model, _normalize_language(language_hint))
+
+
+async def _preprocess(audio_bytes: bytes, filename: str) -> tuple[bytes, str, dict | None]:
+    """(audio, filename, report) to send to the provider; raises EmptyRecording for silent notes."""
+    if not STT_PREPROCESS or STT_DECODE == "tempfile":
+        return audio_bytes, filename, None
+    try:
+        with stage("preprocess"):
+            wav, report = await asyncio.to_thread(preprocess_audio, audio_bytes)
+    except EmptyRecording:
+        inc("nursesync_stt_rejected_total")
+        raise
+    except (RuntimeError, OSError) as e:
+        # undecodable here (or no ffmpeg on a Sarvam-only box): the provider gets the original
+        print(f"⚠️ Audio preprocessing skipped: {e}")
+        return audio_bytes, filename, None
+    inc("nursesync_audio_seconds_total", report["input_s"], kind="input")
+    inc("nursesync_audio_seconds_total", report["trimmed_s"], kind="trimmed")
+    return wav, os.path.splitext(filename)[0] + ".wav", report
+
+
+def _with_savings(result: dict, report: dict | None) -> dict:
+    if report is None:
+        return dict(result)
+    # trimmed silence priced at the provider's current per-second rate
+    provider = result["provider"]
+    saved_ms = report["trimmed_s"] * provider_latency[provider].ms_per_second
+    inc("nursesync_stt_saved_seconds_total", saved_ms / 1000, provider=provider)
+    return {**result, "preprocess": {**report, "saved_ms_est": round(saved_ms)}}
+
+
+async def _transcribe_auto(audio_bytes: bytes, filename: str, language_hint: str, stt_mode: str, stt_model: str) -> dict:
+    providers = ["whisper", "sarvam"] if _sarvam_available() else ["whisper"]
+    keys = {p: _cache_key(audio_bytes, p, language_hint, stt_mode, stt_model) for p in providers}
+    for provider in providers:
+        cached = await stt_cache.get(keys[provider])
+        if cached is not None:
+            return dict(cached)
+
+    # routed on the trimmed length, since that is what the provider will process
+    audio_bytes, filename, report = await _preprocess(audio_bytes, filename)
+    order, estimates = await route_stt(audio_bytes)
+    result, hedged = await _first_success(
+        order, estimates,
+        lambda p: _run_provider(p, audio_bytes, filename, language_hint, stt_mode, stt_model),
+    )
+    await stt_cache.set(keys[result["provider"]], result)
+    return {
+        **_with_savings(result, report),
+        "routing": {
+            "order": order,
+            "estimated_ms": {p: round(ms) for p, ms in estimates.items()},
+            "hedged": hedged,
+        },
+    }
+
+
 async def transcribe_audio(
     audio_bytes: bytes,
     filename: str = "audio.wav",
@@ -84,23 +399,53 @@ async def transcribe_audio(
     stt_mode: str = "transcribe",
     stt_model: str = "saaras:v3",
 ) -> dict:
-    ext = os.path.splitext(filename)[1] or ".wav"
     provider = _normalize_provider(stt_provider)
+    if provider == "auto":
+        return await _transcribe_auto(audio_bytes, filename, language_hint, stt_mode, stt_model)
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp_file:
-        tmp_file.write(audio_bytes)
-        tmp_path = tmp_file.name
+    key = _cache_key(audio_bytes, provider, language_hint, stt_mode, stt_model)
+    cached = await stt_cache.get(key)
+    if cached is not None:
+        return dict(cached)
+    audio_bytes, filename, report = await _preprocess(audio_bytes, filename)
+    result = await _run_provider(provider, audio_bytes, filename, language_hint, stt_mode, stt_model)
+    await stt_cache.set(key, result)
+    return _with_savings(result, report)
 
-    try:
-        if provider == "sarvam":
-            return await asyncio.to_thread(
-                _transcribe_with_sarvam,
-                tmp_path,
-                language_hint,
-                stt_mode,
-                stt_model,
-            )
-
-        return await asyncio.to_thread(_transcribe_with_whisper, tmp_path, language_hint)
-    finally:
-        os.unlink(tmp_path)
+
+# each path is timed as the provider that actually ran it, below the result cache
+# so hits don't read as provider latency
+async def _transcribe_uncached(
+    audio_bytes: bytes,
+    filename: str,
+    provider: str,
+    language_hint: str,
+    stt_mode: str,
+    stt_model: str,
+) -> dict:
+
+    if provider == "sarvam":
+        with stage("stt", "sarvam"):
+            return await _transcribe_with_sarvam(audio_bytes, filename, language_hint, stt_mode, stt_model)
+
+    if STT_DECODE == "tempfile":
+        with stage("stt", "whisper"):
+            return await asyncio.to_thread(_transcribe_file_with_whisper, audio_bytes, filename, language_hint)
+
+    if WHISPER_SERVER_ADDR:
+        audio = await asyncio.to_thread(decode_audio, audio_bytes)
+        if time.monotonic() >= _server_retry_at:
+            try:
+                with stage("stt", "whisper_server"):
+                    result = await _transcribe_via_server(audio, language_hint)
+                    if result is None:
+                        # counted as a failed server call; the in-process run below is timed on its own
+                        raise WhisperServerUnavailable()
+                return result
+            except WhisperServerUnavailable:
+                pass
+        with stage("stt", "whisper"):
+            return await asyncio.to_thread(_transcribe_with_whisper, audio, language_hint)
+
+    with stage("stt", "whisper"):
+        return await asyncio.to_thread(_transcribe_bytes_with_whisper, audio_bytes, language_hint)
@@ -0,0 +1,263 @@
+"""Shared local Whisper inference server.
+
+Run one per host with `python -m services.whisper_server`. It starts one
+inference process per core group (WHISPER_CORE_GROUPS, e.g. "0-3;4-7"), and
+every API worker submits audio over a local TCP socket instead of loading its
+own copy of the model. Short notes that arrive together are micro-batched into
+a single decoder pass.
+"""
+import asyncio
+import itertools
+import json
+import multiprocessing as mp
+import os
+import struct
+import threading
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+WHISPER_SERVER_HOST = os.getenv("WHISPER_SERVER_HOST", "127.0.0.1")
+WHISPER_SERVER_PORT = int(os.getenv("WHISPER_SERVER_PORT", "8765"))
+WHISPER_MODEL_NAME = os.getenv("WHISPER_MODEL", "base")
+WHISPER_BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "8"))
+WHISPER_BATCH_WAIT_MS = float(os.getenv("WHISPER_BATCH_WAIT_MS", "25"))
+# how often inference processes are checked; a dead one fails its batch and is restarted
+WHISPER_WORKER_CHECK_S = float(os.getenv("WHISPER_WORKER_CHECK_S", "1"))
+
+SAMPLE_RATE = 16000
+# whisper decodes 30 s windows; anything shorter can share a batched pass
+BATCHABLE_SAMPLES = 30 * SAMPLE_RATE
+
+
+# ---- wire format: 4-byte header length, JSON header, optional raw payload ----
+
+async def send_frame(writer: asyncio.StreamWriter, header: dict, payload: bytes = b""):
+    header = {**header, "payload_bytes": len(payload)}
+    data = json.dumps(header).encode()
+    writer.write(struct.pack(">I", len(data)) + data + payload)
+    await writer.drain()
+
+
+async def recv_frame(reader: asyncio.StreamReader) -> tuple[dict, bytes]:
+    (size,) = struct.unpack(">I", await reader.readexactly(4))
+    header = json.loads(await reader.readexactly(size))
+    payload = await reader.readexactly(header.get("payload_bytes", 0))
+    return header, payload
+
+
+# ---- inference processes ----
+
+def parse_core_groups(spec: str | None) -> list[list[int]]:
+    if not spec:
+        return [sorted(os.sched_getaffinity(0))]
+    groups = []
+    for group in spec.split(";"):
+        cores = []
+        for part in group.split(","):
+            part = part.strip()
+            if "-" in part:
+                lo, hi = part.split("-")
+                cores.extend(range(int(lo), int(hi) + 1))
+            elif part:
+                cores.append(int(part))
+        if cores:
+            groups.append(cores)
+    return groups
+
+
+def _run_batch(model, whisper, torch, items: list) -> list:
+    language = items[0]["language"]
+    if len(items) == 1 and items[0]["audio"].size > BATCHABLE_SAMPLES:
+        result = model.transcribe(items[0]["audio"], fp16=False, language=language)
+        return [{
+            "text": result.get("text", ""),
+            "language": result.get("language", language),
+            "segments": [{"no_speech_prob": s.get("no_speech_prob", 0)} for s in result.get("segments", [])],
+        }]
+
+    mels = torch.stack([
+        whisper.log_mel_spectrogram(
+            whisper.pad_or_trim(torch.from_numpy(item["audio"])),
+            model.dims.n_mels,
+        )
+        for item in items
+    ]).to(model.device)
+    options = whisper.DecodingOptions(language=language, fp16=False, without_timestamps=True)
+    decoded = whisper.decode(model, mels, options)
+    return [
+        {"text": d.text, "language": d.language, "segments": [{"no_speech_prob": d.no_speech_prob}]}
+        for d in decoded
+    ]
+
+
+def _worker_main(index: int, cores: list, task_q, result_q):
+    os.sched_setaffinity(0, cores)
+    import torch
+    import whisper
+
+    torch.set_num_threads(len(cores))
+    model = whisper.load_model(WHISPER_MODEL_NAME)
+    result_q.put(("ready", index, None))
+
+    while True:
+        batch_id, items = task_q.get()
+        try:
+            result_q.put((batch_id, _run_batch(model, whisper, torch, items), None))
+        except Exception as e:
+            result_q.put((batch_id, None, repr(e)))
+
+
+# ---- front end: accepts requests, micro-batches, dispatches to processes ----
+
+class WhisperServer:
+    def __init__(self, core_groups: list[list[int]]):
+        self.ctx = mp.get_context("spawn")
+        self.core_groups = core_groups
+        # one task queue per process, so a batch is known to belong to the process that died
+        self.task_qs = [self.ctx.Queue() for _ in core_groups]
+        self.result_q = self.ctx.Queue()
+        self.processes = [self._spawn(i) for i in range(len(core_groups))]
+        self.pending: asyncio.Queue = asyncio.Queue()
+        self.carry: list = []
+        self.idle_workers: asyncio.Queue = asyncio.Queue()
+        self.batches: dict[int, tuple[int, list]] = {}  # batch id -> (worker index, futures)
+        self.batch_ids = itertools.count()
+        self.in_flight = 0
+        self.loop = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.pending.qsize() + len(self.carry),
+            "in_flight": self.in_flight,
+            "workers": len(self.processes),
+        }
+
+    def _spawn(self, index: int):
+        return self.ctx.Process(
+            target=_worker_main,
+            args=(index, self.core_groups[index], self.task_qs[index], self.result_q),
+            daemon=True,
+        )
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        for p in self.processes:
+            p.start()
+        for _ in self.processes:
+            _, index, _ = await asyncio.to_thread(self.result_q.get)  # wait for "ready"
+            self.idle_workers.put_nowait(index)
+        threading.Thread(target=self._collect_results, daemon=True).start()
+        asyncio.create_task(self._batch_loop())
+        asyncio.create_task(self._watch_workers())
+
+    def _collect_results(self):
+        while True:
+            batch_id, results, error = self.result_q.get()
+            if batch_id == "ready":
+                # a restarted process has loaded its model
+                self.loop.call_soon_threadsafe(self.idle_workers.put_nowait, results)
+            else:
+                self.loop.call_soon_threadsafe(self._finish_batch, batch_id, results, error)
+
+    async def _watch_workers(self):
+        while True:
+            await asyncio.sleep(WHISPER_WORKER_CHECK_S)
+            for index, process in enumerate(self.processes):
+                if process.is_alive():
+                    continue
+                error = f"whisper worker {index} exited with code {process.exitcode}"
+                print(f"❌ {error}, restarting it")
+                for batch_id, (worker, _) in list(self.batches.items()):
+                    if worker == index:
+                        # the worker is not idle again until the restarted process reports ready
+                        self._finish_batch(batch_id, None, error, release=False)
+                # fresh queue: a batch the dead process never picked up is already failed
+                self.task_qs[index] = self.ctx.Queue()
+                self.processes[index] = self._spawn(index)
+                self.processes[index].start()
+
+    def _finish_batch(self, batch_id, results, error, release: bool = True):
+        entry = self.batches.pop(batch_id, None)
+        if entry is None:
+            return  # already failed when its worker died
+        worker, futures = entry
+        self.in_flight -= len(futures)
+        if release:
+            self.idle_workers.put_nowait(worker)
+        for i, fut in enumerate(futures):
+            if fut.done():
+                continue
+            if error:
+                fut.set_exception(RuntimeError(error))
+            else:
+                fut.set_result(results[i])
+
+    def _dispatch(self, worker: int, batch: list):
+        batch_id = next(self.batch_ids)
+        self.batches[batch_id] = (worker, [fut for _, fut in batch])
+        self.in_flight += len(batch)
+        self.task_qs[worker].put((batch_id, [item for item, _ in batch]))
+
+    async def _batch_loop(self):
+        while True:
+            # only build a batch once a worker can take it, so requests pile up meanwhile
+            worker = await self.idle_workers.get()
+            first = self.carry.pop(0) if self.carry else await self.pending.get()
+            batch = [first]
+            if first[0]["audio"].size <= BATCHABLE_SAMPLES:
+                deadline = self.loop.time() + WHISPER_BATCH_WAIT_MS / 1000
+                while len(batch) < WHISPER_BATCH_SIZE:
+                    timeout = deadline - self.loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        nxt = await asyncio.wait_for(self.pending.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    # long notes and other languages lead the next batch instead
+                    if nxt[0]["audio"].size > BATCHABLE_SAMPLES or nxt[0]["language"] != first[0]["language"]:
+                        self.carry.append(nxt)
+                        break
+                    batch.append(nxt)
+            self._dispatch(worker, batch)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    header, payload = await recv_frame(reader)
+                except asyncio.IncompleteReadError:
+                    break
+
+                if header.get("op") == "stats":
+                    await send_frame(writer, {"ok": True, **self.stats()})
+                    continue
+
+                item = {
+                    "audio": np.frombuffer(payload, dtype=np.float32).copy(),
+                    "language": header.get("language", "en"),
+                }
+                fut = self.loop.create_future()
+                await self.pending.put((item, fut))
+                try:
+                    result = await fut
+                    await send_frame(writer, {"ok": True, "result": result})
+                except Exception as e:
+                    await send_frame(writer, {"ok": False, "error": str(e)})
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int):
+        await self.start()
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"🎙️  Whisper server on {host}:{port} with {len(self.processes)} worker(s)")
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    groups = parse_core_groups(os.getenv("WHISPER_CORE_GROUPS"))
+    asyncio.run(WhisperServer(groups).serve(WHISPER_SERVER_HOST, WHISPER_SERVER_PORT))
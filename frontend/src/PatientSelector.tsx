@@ -12,7 +12,9 @@ export default function PatientSelector({
   selectedId,
 }: PatientSelectorProps) {
   const [patients, setPatients] = useState<Patient[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [search, setSearch] = useState("");
 
   useEffect(() => {
@@ -20,7 +22,9 @@ export default function PatientSelector({
 
     listPatients()
       .then((data) => {
-        if (!cancelled) setPatients(data.patients);
+        if (cancelled) return;
+        setPatients(data.patients);
+        setNextCursor(data.next_cursor ?? null);
       })
       .catch((err) => {
         if (!cancelled) console.error("Failed to fetch patients:", err);
@@ -34,6 +38,20 @@ export default function PatientSelector({
     };
   }, []);
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await listPatients(nextCursor);
+      setPatients((current) => [...current, ...page.patients]);
+      setNextCursor(page.next_cursor ?? null);
+    } catch (err) {
+      console.error("Failed to fetch patients:", err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const filtered = patients.filter((p) => {
     const haystack = `${p.name} ${p.ward}`.toLowerCase();
     return haystack.includes(search.toLowerCase());
@@ -89,6 +107,18 @@ export default function PatientSelector({
             </button>
           );
         })}
+
+        {nextCursor && (
+          <button
+            type="button"
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="rounded-2xl border py-3 text-sm font-bold text-[var(--text-primary)] transition-colors disabled:opacity-60"
+            style={{ backgroundColor: "var(--bg-glass)", borderColor: "var(--border-subtle)" }}
+          >
+            {loadingMore ? "Loading..." : "Load more patients"}
+          </button>
+        )}
       </div>
     </div>
   );
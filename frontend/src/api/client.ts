@@ -24,8 +24,11 @@ const api = axios.create({
   baseURL: API_BASE_URL,
 });
 
-export async function listPatients(): Promise<PatientListResponse> {
-  const { data } = await api.get<PatientListResponse>("/api/patients/");
+// list endpoints are keyset-paginated: each call returns one page, pass its next_cursor for the next
+export async function listPatients(cursor?: string | null): Promise<PatientListResponse> {
+  const { data } = await api.get<PatientListResponse>("/api/patients/", {
+    params: cursor ? { cursor } : undefined,
+  });
   return data;
 }
 
@@ -78,9 +81,11 @@ export async function chatWithAgent(
 
 export async function parsePrescription(
   file: File,
+  patientId: string,
 ): Promise<PrescriptionParseResponse> {
   const formData = new FormData();
   formData.append("file", file);
+  formData.append("patient_id", patientId);
 
   const { data } = await api.post<PrescriptionParseResponse>(
     "/api/prescription/parse",
@@ -120,7 +125,10 @@ export async function createLogFromAudio(params: {
 
 export async function getLogsByPatient(
   patientId: string,
+  cursor?: string | null,
 ): Promise<PatientLogsResponse> {
-  const { data } = await api.get<PatientLogsResponse>(`/api/logs/patient/${patientId}`);
+  const { data } = await api.get<PatientLogsResponse>(`/api/logs/patient/${patientId}`, {
+    params: cursor ? { cursor } : undefined,
+  });
   return data;
 }
@@ -8,6 +8,8 @@ export interface Patient {
 
 export interface PatientListResponse {
   patients: Patient[];
+  next_cursor?: string | null;
+  total?: number;
 }
 
 export interface StructuredLog {
@@ -20,6 +22,7 @@ export interface StructuredLog {
   priority: string;
   matched_prescription: boolean;
   confidence?: number;
+  extracted_by?: "rules" | "gemini" | "megallm";
 }
 
 export interface LogRecord {
@@ -41,11 +44,28 @@ export interface CreateLogResponse {
   needs_review: boolean;
   structured_log: StructuredLog;
   saved: LogRecord;
+  pipeline_mode?: "two_stage" | "fused" | "compare";
+  timings_ms?: Record<string, number>;
+  stt_provider?: string;
+  stt_routing?: {
+    order: string[];
+    estimated_ms: Record<string, number>;
+    hedged: boolean;
+  };
+  stt_preprocess?: {
+    input_s: number;
+    kept_s: number;
+    trimmed_s: number;
+    preprocess_ms: number;
+    saved_ms_est: number;
+  };
 }
 
 export interface PatientLogsResponse {
   logs: LogRecord[];
   count: number;
+  next_cursor?: string | null;
+  total?: number;
 }
 
 export interface Shift {
@@ -99,17 +119,24 @@ export interface AcceptHandoffResponse {
 export interface AgentChatRequest {
   message: string;
   patient_id: string | null;
+  session_id?: string;
   conversation_history: Array<{ role: "user" | "assistant"; content: string }>;
 }
 
 export interface AgentChatResponse {
   reply: string;
+  session_id?: string;
+  history?: Array<{ role: "user" | "assistant"; content: string }>;
   sources?: unknown[];
 }
 
 export interface PrescriptionParseResponse {
   raw: string;
   filename: string;
+  file_url?: string;
+  sha256?: string;
+  deduplicated?: boolean;
+  parse_job_id?: string;
 }
 
 export interface MedicationExtractionItem {
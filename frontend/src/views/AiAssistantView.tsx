@@ -21,6 +21,8 @@ export default function AIAssistantView() {
   const [draft, setDraft] = useState("");
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  // the server keeps (and compacts) the history under this id
+  const [sessionId] = useState(() => crypto.randomUUID());
 
   const conversationHistory = useMemo(
     () => messages.map((msg) => ({ role: msg.role, content: msg.content })),
@@ -42,6 +44,7 @@ export default function AIAssistantView() {
       const response = await chatWithAgent({
         message: question,
         patient_id: selectedPatient?.id ?? null,
+        session_id: sessionId,
         conversation_history: conversationHistory,
       });
 
@@ -12,13 +12,16 @@ export default function PatientTimelineView() {
 
   const [patient, setPatient] = useState<Patient | null>(selectedPatient);
   const [logs, setLogs] = useState<LogRecord[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
     if (!selectedPatient) {
       setPatient(null);
       setLogs([]);
+      setNextCursor(null);
       return;
     }
 
@@ -34,6 +37,7 @@ export default function PatientTimelineView() {
         if (cancelled) return;
         setPatient(patientData);
         setLogs(logsData.logs);
+        setNextCursor(logsData.next_cursor ?? null);
       })
       .catch(() => {
         if (cancelled) return;
@@ -49,6 +53,21 @@ export default function PatientTimelineView() {
     };
   }, [selectedPatient]);
 
+  // older history is fetched a page at a time, only when asked for
+  const loadOlderLogs = async () => {
+    if (!selectedPatient || !nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await getLogsByPatient(selectedPatient.id, nextCursor);
+      setLogs((current) => [...current, ...page.logs]);
+      setNextCursor(page.next_cursor ?? null);
+    } catch {
+      setError("Failed to fetch older logs.");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   if (!selectedPatient) {
     return (
       <div className="screen-wrapper text-[var(--text-primary)] bg-[var(--surface-bg)]">
@@ -142,6 +161,19 @@ export default function PatientTimelineView() {
           </article>
         ))}
       </section>
+
+      {!loading && nextCursor && (
+        <section className="flex justify-center pb-3">
+          <button
+            type="button"
+            onClick={loadOlderLogs}
+            disabled={loadingMore}
+            className="rounded-full border border-[var(--border-subtle)] bg-white px-5 py-2.5 text-sm font-bold text-[var(--text-primary)] shadow-sm transition-transform hover:scale-[1.02] disabled:opacity-60"
+          >
+            {loadingMore ? "Loading..." : "Load older logs"}
+          </button>
+        </section>
+      )}
     </div>
   );
 }
@@ -35,6 +35,10 @@ export default function ScannerView() {
   }, [selectedPatient?.id]);
 
   const handleFileUpload = async (file: File) => {
+    if (!selectedPatient?.id) {
+      setError("Select a patient before uploading a prescription.");
+      return;
+    }
     setLoading(true);
     setError(null);
 
@@ -45,7 +49,7 @@ export default function ScannerView() {
     try {
       const formData = new FormData();
       formData.append("file", file);
-      formData.append("patient_id", selectedPatient?.id ?? "none");
+      formData.append("patient_id", selectedPatient.id);
 
       const { data } = await axios.post(
         `${BASE_URL}/api/prescription/parse`,
@@ -61,12 +65,10 @@ export default function ScannerView() {
 
 
       // refresh prescription list
-      if (selectedPatient?.id) {
-        const updated = await axios.get(
-          `${BASE_URL}/api/prescription/${selectedPatient.id}`,
-        );
-        setPrescriptions(updated.data.prescriptions);
-      }
+      const updated = await axios.get(
+        `${BASE_URL}/api/prescription/${selectedPatient.id}`,
+      );
+      setPrescriptions(updated.data.prescriptions);
     } catch {
       setError("Failed to upload prescription.");
     } finally {